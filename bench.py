@@ -0,0 +1,311 @@
+"""性能基准：界面冷启动、格式化、分子量解析、数据库加载/保存、历史记录与前驱体质量计算。
+
+全部走无界面代码路径（历史列表刷新使用 Treeview 桩对象），可在无显示器的机器上运行：
+
+    python bench.py                          # 规模 10³–10⁶，结果写入 bench_output.txt
+    python bench.py --sizes 1000,10000       # 指定规模
+    python bench.py --save-baseline          # 保存为基线 bench_baseline.json
+    python bench.py --threshold 0.2          # 与基线比较，吞吐下降或 p50 上升超过 20% 时退出码为 1
+    python bench.py --require-baseline       # 仓库不附带基线（与机器相关）；CI 中缺少基线时以退出码 2 结束
+
+各用例轮流运行 --repeat 轮，每项指标取最好的一轮（吞吐最高、延迟最低）；与基线比较时差值还须超过 --noise-floor-ms，
+避免亚微秒级操作的计时抖动被判为回退；p95/p99 只报告不参与判定（几十个样本的尾部延迟主要反映机器抖动）。经过文件系统/SQLite 的用例（STORAGE_CASES）在不同进程间
+波动可达 ±30%，使用单独的 --storage-threshold。每轮先运行固定的校准计算，与基线比较前按两次运行
+的校准耗时之比折算纯计算用例的机器快慢（STORAGE_CASES 不折算）。
+"""
+import os
+import gc
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import subprocess
+import tracemalloc
+
+from calc_core import (ElementInfo, HistoryStore, MolarMassEngine, smart_format_formula, precursor_mass,
+                       batch_precursor_mass, atomic_write_json)
+
+# ==================== 合成数据 ====================
+
+_METALS = ['Mg', 'Al', 'Fe', 'Co', 'Ni', 'Cu', 'Zn', 'La', 'Ce', 'Ag', 'Pt', 'Pd', 'Ru', 'Mn', 'Cr', 'Zr']
+_ANIONS = ['(NO3){n}', '(OH){n}', 'Cl{n}', '(SO4){n}', '(CH3COO){n}', 'O{n}', '(CO3){n}']
+
+def synthetic_formulas(n, seed=0):
+    """生成 n 个互不相同的 ASCII 化学式（金属 × 阴离子 × 计量数 × 结晶水）"""
+    rnd = random.Random(seed); out = []
+    for i in range(n):
+        m = rnd.choice(_METALS); a = rnd.choice(_ANIONS).format(n=rnd.randint(1, 4))
+        k = i // (len(_METALS) * len(_ANIONS))  # 用序号保证唯一
+        out.append(f"{m}{rnd.randint(1, 3)}{a}·{k}H2O" if k else f"{m}{rnd.randint(1, 3)}{a}")
+    return out
+
+def synthetic_library(n, seed=0):
+    """element_db.json（第 2 版差异格式）中的 n 个自定义化合物"""
+    rnd = random.Random(seed); elements = {}
+    for f in synthetic_formulas(n, seed):
+        sym = rnd.choice(_METALS)
+        elements.setdefault(sym, {'added': [], 'removed': []})['added'].append([smart_format_formula(f), round(rnd.uniform(50, 500), 3)])
+    return {'version': 2, 'elements': elements}
+
+def synthetic_history(n, seed=0):
+    rnd = random.Random(seed); pre = [smart_format_formula(f) for f in ('Ni(NO3)2·6H2O', 'Cu(NO3)2·3H2O', 'La(NO3)3·6H2O')]
+    return [{'timestamp': f"2026-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d} 10:00:00", 'loading': rnd.uniform(1, 20),
+             'support': rnd.uniform(1, 50), 'mx': 58.693, 'mz': 290.795, 'mx_name': rnd.choice(_METALS), 'mz_name': rnd.choice(pre),
+             'precursor_mass': rnd.uniform(0.1, 10)} for _ in range(n)]
+
+# ==================== 计时工具 ====================
+
+def _sample_latency(fn, args_list):
+    """逐次计时（秒）"""
+    lat = []
+    for a in args_list:
+        t = time.perf_counter(); fn(*a); lat.append(time.perf_counter() - t)
+    return lat
+
+def percentile(values, q):
+    if not values: return None
+    v = sorted(values); i = min(int(round(q / 100 * (len(v) - 1))), len(v) - 1)
+    return v[i]
+
+def _reps(n):
+    """整库加载/保存等慢操作的采样次数：规模越大越少，但至少 5 次"""
+    return max(5, min(30, 3_000_000 // max(n, 1)))
+
+class _StubTree:
+    """模拟 ttk.Treeview 的最小接口，用于无界面测量历史列表刷新"""
+    def __init__(self): self.rows = {}
+    def get_children(self): return list(self.rows)
+    def delete(self, *iids):
+        for i in iids: self.rows.pop(i, None)
+    def insert(self, parent, index, iid=None, values=()): self.rows[iid] = values; return iid
+
+# ==================== 基准用例 ====================
+# 每个用例接收 (规模, 工作目录)，返回 (操作数, 总耗时秒, 单次延迟样本列表)
+
+def bench_format(n, wd):
+    data = synthetic_formulas(n)
+    t = time.perf_counter()
+    for f in data: smart_format_formula(f)
+    total = time.perf_counter() - t
+    return n, total, _sample_latency(smart_format_formula, [(f,) for f in data[:1000]])
+
+def bench_parse(n, wd):
+    data = synthetic_formulas(n); db = ElementInfo(filename=os.path.join(wd, "none.json"), snapshot=None)
+    engine = MolarMassEngine(db.mass_data, cache_size=max(n, 1))
+    t = time.perf_counter(); engine.batch_molar_mass(data); total = time.perf_counter() - t
+    cold = MolarMassEngine(db.mass_data)
+    return n, total, _sample_latency(cold.molar_mass, [(f,) for f in data[:1000]])
+
+def _write_library(n, wd):
+    path = os.path.join(wd, f"element_db_{n}.json")
+    if not os.path.exists(path): atomic_write_json(path, synthetic_library(n))
+    return path
+
+def bench_element_info_cold(n, wd):
+    """无快照：构建内置库 + load_custom_data 合并"""
+    path = _write_library(n, wd); lat = []
+    for _ in range(_reps(n)):
+        t = time.perf_counter(); ElementInfo(filename=path, snapshot=None); lat.append(time.perf_counter() - t)
+    return len(lat), sum(lat), lat
+
+def bench_element_info_snapshot(n, wd):
+    path = _write_library(n, wd); snap = path + ".cache"
+    ElementInfo(filename=path, snapshot=snap); lat = []
+    for _ in range(_reps(n)):
+        t = time.perf_counter(); ElementInfo(filename=path, snapshot=snap); lat.append(time.perf_counter() - t)
+    return len(lat), sum(lat), lat
+
+def bench_save_custom_data(n, wd):
+    path = _write_library(n, wd); db = ElementInfo(filename=path, snapshot=None); lat = []
+    for _ in range(_reps(n)):
+        t = time.perf_counter(); db.save_custom_data(); lat.append(time.perf_counter() - t)
+    return len(lat), sum(lat), lat
+
+def _history_store(n, wd):
+    path = os.path.join(wd, f"history_{n}.db")
+    fresh = not os.path.exists(path)
+    store = HistoryStore(path=path, legacy_json=None, engine=ElementInfo(filename=os.path.join(wd, "none.json"), snapshot=None).engine)
+    if fresh: store.append_many(synthetic_history(n))
+    return store
+
+def bench_save_history(n, wd):
+    """在已有 n 条记录的库中追加单条记录（原实现为整文件重写）"""
+    store = _history_store(n, wd); recs = synthetic_history(200, seed=1)
+    lat = _sample_latency(store.append, [(r,) for r in recs])
+    for r in store.query(limit=len(recs)): store.delete(r['id'])
+    store.close()
+    return len(recs), sum(lat), lat
+
+def bench_update_history(n, wd):
+    """重新载入历史列表第一页（Treeview 桩）"""
+    from calc_gui import CatalystCalculator  # 仅导入模块，不创建 Tk 窗口
+    class App: pass
+    for name in ('update_history', 'load_history_page'): setattr(App, name, getattr(CatalystCalculator, name))
+    App.history_values = staticmethod(CatalystCalculator.history_values)
+    app = App(); app.tree = _StubTree(); app.history = _history_store(n, wd); app.oldest_id = None
+    app.history_exhausted = False; app.page_pending = False
+    lat = _sample_latency(app.update_history, [()] * 20)
+    lat += _sample_latency(app.load_history_page, [()] * 20)  # 向下翻页
+    app.history.close()
+    return len(lat), sum(lat), lat
+
+def bench_history_query(n, wd):
+    """按元素 + 日期过滤取第一页"""
+    store = _history_store(n, wd)
+    lat = [_timed(lambda: store.query(limit=200, element='Ni', start='2026-06-01')) for _ in range(20)]
+    store.close()
+    return len(lat), sum(lat), lat
+
+def _timed(fn):
+    t = time.perf_counter(); fn(); return time.perf_counter() - t
+
+def bench_precursor_scalar(n, wd):
+    rnd = random.Random(0); args = [(rnd.uniform(1, 20), rnd.uniform(1, 50), 58.693, 290.795) for _ in range(n)]
+    t = time.perf_counter()
+    for a in args: precursor_mass(*a)
+    total = time.perf_counter() - t
+    return n, total, _sample_latency(precursor_mass, args[:1000])
+
+def bench_precursor_batch(n, wd):
+    rnd = random.Random(0)
+    cols = ([rnd.uniform(1, 20) for _ in range(n)], [rnd.uniform(1, 50) for _ in range(n)], [58.693] * n, [290.795] * n)
+    lat = [_timed(lambda: batch_precursor_mass(*cols)) for _ in range(_reps(n))]
+    return len(lat) * n, sum(lat), lat
+
+# 新进程中执行界面冷启动里不依赖显示器的部分：导入 calc_gui（含 tkinter、calc_core）、加载数据库、读取历史第一页
+_STARTUP_SCRIPT = """
+import sys
+import calc_gui
+from calc_core import ElementInfo, HistoryStore
+db = ElementInfo(filename=sys.argv[1], snapshot=sys.argv[1] + ".cache")
+HistoryStore(path=sys.argv[2], legacy_json=None, engine=db.engine).query(limit=200)
+"""
+
+def bench_startup(n, wd):
+    """n 个自定义化合物、n 条历史记录时的冷启动（进程启动到数据就绪，含解释器启动），
+    为 calc_gui.STARTUP_BUDGET_MS 提供依据；窗口构建需要显示器，不在此计入"""
+    lib = _write_library(n, wd); _history_store(n, wd).close()
+    cmd = [sys.executable, "-c", _STARTUP_SCRIPT, lib, os.path.join(wd, f"history_{n}.db")]
+    env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.abspath(__file__)))
+    subprocess.run(cmd, env=env, check=True)  # 首次运行生成数据库快照，之后测量的是日常启动
+    lat = []
+    for _ in range(max(5, _reps(n) // 3)):
+        t = time.perf_counter(); subprocess.run(cmd, env=env, check=True); lat.append(time.perf_counter() - t)
+    return len(lat), sum(lat), lat
+
+BENCHMARKS = {
+    'startup': bench_startup,
+    'format': bench_format,
+    'parse': bench_parse,
+    'element_info_cold': bench_element_info_cold,
+    'element_info_snapshot': bench_element_info_snapshot,
+    'save_custom_data': bench_save_custom_data,
+    'save_history': bench_save_history,
+    'update_history': bench_update_history,
+    'history_query': bench_history_query,
+    'precursor_scalar': bench_precursor_scalar,
+    'precursor_batch': bench_precursor_batch,
+}
+
+# 读写文件或 SQLite 的用例，结果受磁盘与页缓存状态影响
+STORAGE_CASES = {'startup', 'element_info_cold', 'element_info_snapshot', 'save_custom_data', 'save_history', 'update_history', 'history_query'}
+
+# ==================== 运行与基线比较 ====================
+
+def sample_case(name, n, wd):
+    """单次运行，返回吞吐与延迟百分位"""
+    gc.collect(); ops, total, lat = BENCHMARKS[name](n, wd)
+    return {'ops': ops, 'seconds': total, 'throughput': ops / total if total else None,
+            **{f'p{q}_ms': percentile(lat, q) * 1000 for q in (50, 95, 99)}}
+
+def peak_memory(name, n, wd):
+    """单独测一次峰值内存（tracemalloc 会拖慢计时）"""
+    gc.collect(); tracemalloc.start()
+    try: BENCHMARKS[name](n, wd); return tracemalloc.get_traced_memory()[1]
+    finally: tracemalloc.stop()
+
+def summarize(name, n, runs, peak):
+    """各指标取多次运行中最好的值：机器负载造成的抖动只会让结果变慢"""
+    best = lambda key, nd: round(min(r[key] for r in runs), nd)
+    return {'name': name, 'size': n, 'ops': runs[0]['ops'], 'repeat': len(runs), 'seconds': best('seconds', 6),
+            'throughput': round(max(r['throughput'] for r in runs), 3) if all(r['throughput'] for r in runs) else None,
+            'p50_ms': best('p50_ms', 4), 'p95_ms': best('p95_ms', 4), 'p99_ms': best('p99_ms', 4), 'peak_mem_mb': round(peak / 2 ** 20, 3)}
+
+def calibrate():
+    """固定的纯 Python 计算量（秒），用于折算运行时机器的快慢（共享主机上同一台机器前后可差 50%）"""
+    t = time.perf_counter(); acc = 0.0
+    for i in range(300_000): acc += (i % 97) * 1.5 / (i % 13 + 1)
+    return time.perf_counter() - t
+
+def run_cases(names, n, wd, repeat=5, calibration=None):
+    """各用例轮流运行 repeat 轮（而不是同一用例连续重复），短时的机器抖动不会集中落在某一个用例上；
+    每轮的校准耗时追加到 calibration"""
+    runs = {name: [] for name in names}
+    for _ in range(repeat):
+        if calibration is not None: calibration.append(calibrate())
+        for name in names: runs[name].append(sample_case(name, n, wd))
+    return [summarize(name, n, runs[name], peak_memory(name, n, wd)) for name in names]
+
+def compare(results, baseline, threshold, noise_floor_ms=0.1, storage_threshold=0.5, calibration=None):
+    """吞吐下降或 p50 上升超过阈值（比例）且绝对差值超过 noise_floor_ms 时判定为回退；
+    吞吐的绝对差值按单次操作耗时计算，STORAGE_CASES 使用 storage_threshold。
+    两次运行都有校准值时，纯计算用例的基线先按机器快慢比例折算；STORAGE_CASES 受磁盘/进程启动支配，
+    与校准循环的 CPU 速度无关，不做折算"""
+    speed = calibration / baseline['calibration_s'] if calibration and baseline.get('calibration_s') else 1.0
+    def scaled(r):
+        if r['name'] in STORAGE_CASES: return r
+        return dict(r, throughput=r['throughput'] and r['throughput'] / speed, p50_ms=r['p50_ms'] * speed)
+    base = {(r['name'], r['size']): scaled(r) for r in baseline.get('results', [])}
+    regressions = []
+    for r in results:
+        b = base.get((r['name'], r['size']))
+        if not b: continue
+        threshold_r = storage_threshold if r['name'] in STORAGE_CASES else threshold
+        if b['throughput'] and r['throughput'] and r['throughput'] < b['throughput'] * (1 - threshold_r) \
+                and (1 / r['throughput'] - 1 / b['throughput']) * 1000 > noise_floor_ms:
+            regressions.append(f"{r['name']}@{r['size']}: 吞吐 {r['throughput']:.1f} < 基线 {b['throughput']:.1f}")
+        if b['p50_ms'] and r['p50_ms'] > b['p50_ms'] * (1 + threshold_r) and r['p50_ms'] - b['p50_ms'] > noise_floor_ms:
+            regressions.append(f"{r['name']}@{r['size']}: p50 {r['p50_ms']:.3f} ms > 基线 {b['p50_ms']:.3f} ms")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="负载型催化剂计算器性能基准")
+    parser.add_argument("--sizes", default="1000,10000,100000,1000000", help="逗号分隔的数据规模")
+    parser.add_argument("--only", help="只运行指定用例（逗号分隔）：" + ",".join(BENCHMARKS))
+    parser.add_argument("--baseline", default="bench_baseline.json")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--require-baseline", action="store_true", help="找不到基线时以退出码 2 结束（用于 CI）")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    parser.add_argument("--storage-threshold", type=float, default=0.5, help="文件/SQLite 用例的回退阈值")
+    parser.add_argument("--repeat", type=int, default=5, help="每个用例重复次数，取最好的一次")
+    parser.add_argument("--noise-floor-ms", type=float, default=0.1, help="判定回退所需的最小绝对差值（毫秒）")
+    parser.add_argument("-o", "--output", default="bench_output.txt", help="JSON 结果输出路径")
+    args = parser.parse_args(argv)
+    sizes = [int(float(s)) for s in args.sizes.split(',')]
+    names = args.only.split(',') if args.only else list(BENCHMARKS)
+    results = []; calibration = []
+    with tempfile.TemporaryDirectory(prefix="catalyst-bench-") as wd:
+        for n in sizes:
+            for r in run_cases(names, n, wd, args.repeat, calibration):
+                results.append(r)
+                print(f"{r['name']:<24}{n:>9}  {r['throughput'] or 0:>14.1f} ops/s  p50 {r['p50_ms']:>10.4f} ms  "
+                      f"p95 {r['p95_ms']:>10.4f} ms  p99 {r['p99_ms']:>10.4f} ms  峰值 {r['peak_mem_mb']:>9.3f} MB", flush=True)
+    report = {'python': sys.version.split()[0], 'timestamp': time.strftime("%Y-%m-%d %H:%M:%S"),
+              'calibration_s': round(min(calibration), 6), 'results': results}
+    with open(args.output, 'w', encoding='utf-8') as f: json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f: json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"基线已保存至 {args.baseline}"); return 0
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as f: regressions = compare(results, json.load(f), args.threshold, args.noise_floor_ms,
+                                                                                  args.storage_threshold, report['calibration_s'])
+        for line in regressions: print("回退:", line)
+        return 1 if regressions else 0
+    # 基线与机器相关，仓库不附带；先在同一台机器上用 --save-baseline 生成
+    print(f"未找到基线 {args.baseline}，未做回退比较" + ("" if not args.require_baseline else "（--require-baseline）"))
+    return 2 if args.require_baseline else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,1119 @@
+import csv
+import json
+import os
+import re
+import sqlite3
+import bisect
+import hashlib
+import functools
+import contextlib
+import tempfile
+import threading
+import time
+import atexit
+from collections import deque
+from datetime import datetime
+
+_np = False  # 尚未尝试导入
+
+def _numpy():
+    """按需导入 numpy：只有批量/扫描/配方路径用到，界面冷启动不必承担其导入时间；未安装时返回 None"""
+    global _np
+    if _np is False:
+        try: import numpy
+        except ImportError: numpy = None
+        _np = numpy
+    return _np
+
+# ==================== 运行时诊断 ====================
+
+def _percentile(sorted_values, q):
+    return sorted_values[min(int(round(q / 100 * (len(sorted_values) - 1))), len(sorted_values) - 1)]
+
+class Instrumentation:
+    """热点操作计时：默认关闭，关闭时被 @timed 包装的函数只多一次属性判断。
+
+    开启后每次调用向定长环形缓冲追加 (时间戳, 操作名, 毫秒)，另按操作名累计总次数；
+    可导出为 JSON lines，或同时在主线程启用 cProfile 并在退出时写出 .prof 文件。
+    由环境变量 CALC_INSTRUMENT（1 或 JSONL 输出路径）、CALC_PROFILE（.prof 路径）
+    或命令行 --instrument / --profile 开启。
+    """
+    DEFAULT_TRACE = "calc_trace.jsonl"
+
+    def __init__(self, capacity=10000):
+        self.enabled = False; self.trace_path = None; self.profile_path = None
+        self._ring = deque(maxlen=capacity); self._counts = {}; self._lock = threading.Lock()
+        self._profiler = None; self._atexit = False
+
+    def configure(self, trace=None, profile=None):
+        """开启计时；trace/profile 为退出时写出的路径（None 表示不写）"""
+        self.enabled = True
+        if trace: self.trace_path = trace
+        if profile and self._profiler is None:
+            import cProfile
+            self.profile_path = profile; self._profiler = cProfile.Profile(); self._profiler.enable()
+        if not self._atexit: atexit.register(self.finish); self._atexit = True
+
+    def configure_from_env(self, environ=os.environ):
+        trace = environ.get("CALC_INSTRUMENT", "").strip(); profile = environ.get("CALC_PROFILE", "").strip()
+        if trace in ("", "0") and not profile: return
+        self.configure(None if trace in ("", "0") else self.DEFAULT_TRACE if trace == "1" else trace, profile or None)
+
+    def record(self, name, ms):
+        self._ring.append((time.time(), name, ms))
+        with self._lock: self._counts[name] = self._counts.get(name, 0) + 1
+
+    def stats(self):
+        """{操作名: {count, recent, p50_ms, p95_ms, p99_ms, max_ms}}；百分位只统计环形缓冲中的近期样本"""
+        by_name = {}
+        for _, name, ms in list(self._ring): by_name.setdefault(name, []).append(ms)
+        with self._lock: counts = dict(self._counts)
+        out = {}
+        for name, total in sorted(counts.items()):
+            v = sorted(by_name.get(name, ()))
+            out[name] = {'count': total, 'recent': len(v), 'max_ms': v[-1] if v else None,
+                         **{f'p{q}_ms': _percentile(v, q) if v else None for q in (50, 95, 99)}}
+        return out
+
+    def export_jsonl(self, path):
+        """每条样本一行 {"ts", "op", "ms"}，末行为 {"summary": stats()}"""
+        with open(path, 'w', encoding='utf-8') as f:
+            for ts, name, ms in list(self._ring):
+                f.write(json.dumps({'ts': datetime.fromtimestamp(ts).isoformat(timespec='milliseconds'), 'op': name, 'ms': round(ms, 3)},
+                                   ensure_ascii=False) + "\n")
+            f.write(json.dumps({'summary': self.stats()}, ensure_ascii=False) + "\n")
+
+    @property
+    def profiling(self): return self._profiler is not None
+
+    def dump_profile(self, path):
+        """写出 cProfile 统计（pstats 格式），之后继续采样"""
+        self._profiler.disable()
+        try: self._profiler.dump_stats(path)
+        finally: self._profiler.enable()
+
+    def finish(self):
+        if self._profiler is not None:
+            self._profiler.disable()
+            try: self._profiler.dump_stats(self.profile_path)
+            except OSError: pass
+            self._profiler = None
+        if self.trace_path:
+            try: self.export_jsonl(self.trace_path)
+            except OSError: pass
+
+instrumentation = Instrumentation()
+instrumentation.configure_from_env()
+
+def timed(name):
+    """方法/函数计时装饰器，记录到全局 instrumentation"""
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not instrumentation.enabled: return fn(*args, **kwargs)
+            t = time.perf_counter()
+            try: return fn(*args, **kwargs)
+            finally: instrumentation.record(name, (time.perf_counter() - t) * 1000)
+        return wrapper
+    return deco
+
+# ==================== 1. 核心纠错与格式化引擎 ====================
+
+def smart_format_formula(text):
+    """智能将普通化学式转换为含下标的标准格式"""
+    if not text: return ""
+    text = text.replace('.', '·').replace('*', '·')
+    sub_map = {'0': '₀', '1': '₁', '2': '₂', '3': '₃', '4': '₄',
+               '5': '₅', '6': '₆', '7': '₇', '8': '₈', '9': '₉'}
+
+    if '·' in text:
+        parts = text.split('·')
+        main_part = "".join(sub_map.get(c, c) if c.isdigit() else c for c in parts[0])
+        res_hydrate = []
+        for p in parts[1:]:
+            match = re.match(r'^(\d+)(.*)$', p.strip())
+            if match:
+                coeff = match.group(1) 
+                mol = "".join(sub_map.get(c, c) if c.isdigit() else c for c in match.group(2))
+                res_hydrate.append(f"{coeff}{mol}")
+            else:
+                res_hydrate.append("".join(sub_map.get(c, c) if c.isdigit() else c for c in p))
+        return f"{main_part}·" + "·".join(res_hydrate)
+
+    return "".join(sub_map.get(c, c) if c.isdigit() else c for c in text)
+
+_SUB_TO_ASCII = str.maketrans('₀₁₂₃₄₅₆₇₈₉', '0123456789')
+_FORMULA_TOKEN = re.compile(r'([A-Z][a-z]?)(\d*)|([(\[])|([)\]])(\d*)')
+_HYDRATE_COEFF = re.compile(r'^(\d*)(.*)$')
+
+def normalize_formula(text):
+    """去除下标/空白并统一结晶水分隔符，作为解析缓存的键"""
+    if not text: return ""
+    text = str(text).translate(_SUB_TO_ASCII)
+    text = text.replace('.', '·').replace('*', '·')
+    return "".join(text.split())
+
+class MolarMassEngine:
+    """基于原子质量表的化学式解析器，解析结果按规范化化学式做 LRU 缓存"""
+    def __init__(self, mass_data, cache_size=65536):
+        self.mass_data = mass_data
+        self._parse_cached = functools.lru_cache(maxsize=cache_size)(self._parse_normalized)
+
+    def _parse_group(self, text):
+        stack = [{}]; pos = 0
+        while pos < len(text):
+            m = _FORMULA_TOKEN.match(text, pos)
+            if not m: raise ValueError(f"无法解析的字符：{text[pos]}")
+            pos = m.end()
+            sym, cnt, opening, closing, mult = m.groups()
+            if sym:
+                if sym not in self.mass_data: raise ValueError(f"未知元素：{sym}")
+                stack[-1][sym] = stack[-1].get(sym, 0) + (int(cnt) if cnt else 1)
+            elif opening:
+                stack.append({})
+            else:
+                if len(stack) == 1: raise ValueError("括号不匹配")
+                inner = stack.pop(); k = int(mult) if mult else 1
+                for s, n in inner.items(): stack[-1][s] = stack[-1].get(s, 0) + n * k
+        if len(stack) != 1: raise ValueError("括号不匹配")
+        return stack[0]
+
+    def _parse_normalized(self, norm):
+        if not norm: raise ValueError("化学式为空")
+        comp = {}
+        for part in norm.split('·'):
+            coeff, body = _HYDRATE_COEFF.match(part).groups()
+            if not body: raise ValueError(f"结晶水部分无效：{part or '·'}")
+            k = int(coeff) if coeff else 1
+            for s, n in self._parse_group(body).items(): comp[s] = comp.get(s, 0) + n * k
+        mass = round(sum(self.mass_data[s] * n for s, n in comp.items()), 3)
+        return mass, tuple(comp.items())
+
+    def parse(self, formula):
+        """返回 (摩尔质量, {元素: 原子数})，无法解析时抛出 ValueError"""
+        mass, comp = self._parse_cached(normalize_formula(formula))
+        return mass, dict(comp)
+
+    def molar_mass(self, formula):
+        return self._parse_cached(normalize_formula(formula))[0]
+
+    def batch_molar_mass(self, formulas):
+        """批量解析：先按规范化键去重再解析，无法解析的条目返回 None"""
+        keys = [normalize_formula(f) for f in formulas]
+        resolved = {}
+        for k in set(keys):
+            try: resolved[k] = self._parse_cached(k)[0]
+            except ValueError: resolved[k] = None
+        return [resolved[k] for k in keys]
+
+    def cache_info(self): return self._parse_cached.cache_info()
+
+# ==================== 2. 数据库管理 ====================
+
+# 修改内置化合物表或快照结构时递增，使旧快照失效
+DB_SNAPSHOT_VERSION = 3
+
+class Compound:
+    """化合物记录；可按 (化学式, 分子量) 解包"""
+    __slots__ = ('formula', 'mass')
+
+    def __init__(self, formula, mass): self.formula = formula; self.mass = mass
+    def __iter__(self): yield self.formula; yield self.mass
+    def __repr__(self): return f"Compound({self.formula!r}, {self.mass!r})"
+
+class CompoundStore:
+    """单个元素的化合物表：以 normalize_formula 规范化后的化学式为键，查找/去重/删除均为 O(1)，迭代保持插入顺序"""
+    __slots__ = ('_items',)
+
+    def __init__(self, rows=()):
+        self._items = {}
+        for f, m in rows: self.add(f, m)
+
+    def add(self, formula, mass):
+        """已存在同键条目时不做修改并返回 False"""
+        k = normalize_formula(formula)
+        if not k or k in self._items: return False
+        self._items[k] = Compound(formula, mass); return True
+
+    def get(self, formula): return self._items.get(normalize_formula(formula))
+    def get_key(self, key): return self._items.get(key)
+
+    def remove(self, formula):
+        """按键删除，返回被删除的记录（不存在时为 None）"""
+        return self._items.pop(normalize_formula(formula), None)
+
+    def copy(self):
+        new = CompoundStore(); new._items = {k: Compound(c.formula, c.mass) for k, c in self._items.items()}
+        return new
+
+    def items(self): return self._items.items()
+
+    def to_rows(self):
+        """快照用的纯数据形式 [[键, 化学式, 分子量]]"""
+        return [[k, c.formula, c.mass] for k, c in self._items.items()]
+
+    @classmethod
+    def from_rows(cls, rows):
+        """由 to_rows 的结果恢复，键已规范化，不再逐条解析"""
+        new = cls(); new._items = {k: Compound(f, m) for k, f, m in rows}
+        return new
+
+    def __contains__(self, formula): return normalize_formula(formula) in self._items
+    def __iter__(self): return iter(self._items.values())
+    def __len__(self): return len(self._items)
+
+class ElementInfo:
+    @timed("db.load")
+    def __init__(self, filename="element_db.json", snapshot=True):
+        # 快照默认放在数据文件旁（element_db.json.cache）；传 None 关闭，传路径则使用指定位置
+        self.filename = filename; self.snapshot = filename + ".cache" if snapshot is True else snapshot
+        # 全量原子质量 (精确至 0.001)
+        self.mass_data = {
+            'H': 1.008, 'He': 4.003, 'Li': 6.941, 'Be': 9.012, 'B': 10.811, 'C': 12.011, 'N': 14.007, 'O': 15.999, 'F': 18.998, 'Ne': 20.180,
+            'Na': 22.990, 'Mg': 24.305, 'Al': 26.982, 'Si': 28.085, 'P': 30.974, 'S': 32.065, 'Cl': 35.453, 'Ar': 39.948, 'K': 39.098, 'Ca': 40.078,
+            'Sc': 44.956, 'Ti': 47.867, 'V': 50.942, 'Cr': 51.996, 'Mn': 54.938, 'Fe': 55.845, 'Co': 58.933, 'Ni': 58.693, 'Cu': 63.546, 'Zn': 65.380,
+            'Ga': 69.723, 'Ge': 72.630, 'As': 74.922, 'Se': 78.960, 'Br': 79.904, 'Kr': 83.798, 'Rb': 85.468, 'Sr': 87.620, 'Y': 88.906, 'Zr': 91.224,
+            'Nb': 92.906, 'Mo': 95.960, 'Tc': 98.000, 'Ru': 101.070, 'Rh': 102.906, 'Pd': 106.420, 'Ag': 107.868, 'Cd': 112.411, 'In': 114.818, 'Sn': 118.710,
+            'Sb': 121.760, 'Te': 127.600, 'I': 126.904, 'Xe': 131.293, 'Cs': 132.905, 'Ba': 137.327, 'La': 138.905, 'Ce': 140.116, 'Pr': 140.908, 'Nd': 144.242,
+            'Pm': 145.000, 'Sm': 150.360, 'Eu': 151.964, 'Gd': 157.250, 'Tb': 158.925, 'Dy': 162.500, 'Ho': 164.930, 'Er': 167.259, 'Tm': 168.934, 'Yb': 173.054,
+            'Lu': 174.967, 'Hf': 178.490, 'Ta': 180.948, 'W': 183.840, 'Re': 186.207, 'Os': 190.230, 'Ir': 192.217, 'Pt': 195.084, 'Au': 196.967, 'Hg': 200.592,
+            'Tl': 204.383, 'Pb': 207.200, 'Bi': 208.980, 'Po': 209.000, 'At': 210.000, 'Rn': 222.000, 'Fr': 223.000, 'Ra': 226.000, 'Ac': 227.000, 'Th': 232.038,
+            'Pa': 231.036, 'U': 238.029, 'Np': 237.000, 'Pu': 244.000, 'Am': 243.000, 'Cm': 247.000, 'Bk': 247.000, 'Cf': 251.000, 'Es': 252.000, 'Fm': 257.000,
+            'Md': 258.000, 'No': 259.000, 'Lr': 262.000, 'Rf': 267.000, 'Db': 270.000, 'Sg': 271.000, 'Bh': 270.000, 'Hs': 277.000, 'Mt': 276.000, 'Ds': 281.000,
+            'Rg': 280.000, 'Cn': 285.000, 'Nh': 284.000, 'Fl': 289.000, 'Mc': 288.000, 'Lv': 293.000, 'Ts': 294.000, 'Og': 294.000
+        }
+        self.name_map = {
+            'H':'氢','He':'氦','Li':'锂','Be':'铍','B':'硼','C':'碳','N':'氮','O':'氧','F':'氟','Ne':'氖',
+            'Na':'钠','Mg':'镁','Al':'铝','Si':'硅','P':'磷','S':'硫','Cl':'氯','Ar':'氩','K':'钾','Ca':'钙',
+            'Sc':'钪','Ti':'钛','V':'钒','Cr':'铬','Mn':'锰','Fe':'铁','Co':'钴','Ni':'镍','Cu':'铜','Zn':'锌',
+            'Ga':'镓','Ge':'锗','As':'砷','Se':'硒','Br':'溴','Kr':'氪','Rb':'铷','Sr':'锶','Y':'钇','Zr':'锆',
+            'Nb':'铌','Mo':'钼','Tc':'锝','Ru':'钌','Rh':'铑','Pd':'钯','Ag':'银','Cd':'镉','In':'铟','Sn':'锡',
+            'Sb':'锑','Te':'碲','I':'碘','Xe':'氙','Cs':'铯','Ba':'钡','La':'镧','Ce':'铈','Pr':'镨','Nd':'钕',
+            'Pm':'钷','Sm':'钐','Eu':'铕','Gd':'钆','Tb':'铽','Dy':'镝','Ho':'钬','Er':'铒','Tm':'铥','Yb':'镱',
+            'Lu':'镥','Hf':'铪','Ta':'钽','W':'钨','Re':'铼','Os':'锇','Ir':'铱','Pt':'铂','Au':'金','Hg':'汞',
+            'Tl':'铊','Pb':'铅','Bi':'铋','Po':'钋','At':'砹','Rn':'氡','Fr':'钫','Ra':'镭','Ac':'锕','Th':'钍',
+            'Pa':'镤','U':'铀','Np':'镎','Pu':'钚','Am':'镅','Cm':'锔','Bk':'锫','Cf':'锎','Es':'锿','Fm':'镄',
+            'Md':'钔','No':'锘','Lr':'铹','Rf':'𬬻','Db':'𬭊','Sg':'𬭳','Bh':'𬭛','Hs':'𬭶','Mt':'鿏','Ds':'𫟼',
+            'Rg':'𬬭','Cn':'鎶','Nh':'鿭','Fl':'𫓧','Mc':'镆','Lv':'𫟷','Ts':'𫑼','Og':'𬭯'
+        }
+        self.engine = MolarMassEngine(self.mass_data)
+        self.writer = None; self.load_error = None; self.source_unread = False; self.lock = RWLock()
+        self._index = None; self._index_log = None; self._index_gen = 0; self._index_build = threading.Lock()
+        if not self.load_snapshot():
+            self.elements = self.get_initial_db()
+            self.builtin = {sym: info['compounds'].copy() for sym, info in self.elements.items()}
+            self.load_custom_data()
+            if self.load_error is None: self.save_snapshot()
+
+    def _source_stat(self):
+        try: st = os.stat(self.filename); return (st.st_mtime_ns, st.st_size)
+        except OSError: return None
+
+    def _source_hash(self):
+        try:
+            with open(self.filename, 'rb') as f: return hashlib.sha1(f.read()).hexdigest()
+        except OSError: return None
+
+    def load_snapshot(self):
+        """一次读取预构建的合并数据库；版本不符或 element_db.json 的 mtime 与内容哈希都变化时返回 False。
+
+        快照是纯 JSON 数据（不用 pickle：配置目录可能在共享网络盘上，反序列化他人写入的 pickle 等于执行任意代码）。
+        """
+        if not self.snapshot: return False
+        try:
+            with open(self.snapshot, 'rb') as f: snap = json.loads(f.read())
+            if snap.get('version') != DB_SNAPSHOT_VERSION: return False
+            stat = self._source_stat(); stat = list(stat) if stat else None
+            if stat != snap['stat']:
+                if self._source_hash() != snap['sha1']: return False
+                snap['stat'] = stat; _atomic_write_bytes(self.snapshot, json.dumps(snap, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+            self.elements = {sym: dict(info, compounds=CompoundStore.from_rows(info['compounds'])) for sym, info in snap['elements'].items()}
+            self.builtin = {sym: CompoundStore.from_rows(rows) for sym, rows in snap['builtin'].items()}
+            return True
+        except Exception:  # 快照只是缓存，任何读取问题都回退到完整构建
+            return False
+
+    def invalidate_snapshot(self):
+        """文件系统 mtime 精度较粗时同一秒内的改写可能无法区分，因此保存前直接删除快照"""
+        if not self.snapshot: return
+        try: os.remove(self.snapshot)
+        except OSError: pass
+
+    def save_snapshot(self):
+        if not self.snapshot: return
+        stat = self._source_stat()
+        snap = {'version': DB_SNAPSHOT_VERSION, 'stat': list(stat) if stat else None, 'sha1': self._source_hash(),
+                'elements': {sym: dict(info, compounds=info['compounds'].to_rows()) for sym, info in self.elements.items()},
+                'builtin': {sym: store.to_rows() for sym, store in self.builtin.items()}}
+        try: _atomic_write_bytes(self.snapshot, json.dumps(snap, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+        except OSError: pass
+
+    def get_initial_db(self):
+        raw_compounds = {
+            'Mg': [('MgO', 40.304), ('Mg(OH)2', 58.320), ('Mg(NO3)2', 148.315), ('Mg(NO3)2·6H2O', 256.407), ('MgCO3', 84.314)],
+            'Al': [('Al2O3', 101.961), ('Al(OH)3', 78.004), ('Al(NO3)3', 212.996), ('Al(NO3)3·9H2O', 375.134)],
+            'Fe': [('Fe2O3', 159.688), ('Fe3O4', 231.533), ('Fe(OH)3', 106.867), ('Fe(NO3)3·9H2O', 403.999)],
+            'Cu': [('CuO', 79.545), ('Cu2O', 143.091), ('Cu(OH)2', 97.561), ('Cu(NO3)2·3H2O', 241.602)],
+            'Li': [('Li2O', 29.881), ('LiOH', 23.948), ('LiNO3', 68.946)],
+            'Na': [('Na2O', 61.979), ('NaOH', 39.997), ('NaNO3', 84.995), ('Na2CO3', 105.988)],
+            'Co': [('Co3O4', 240.797), ('Co(OH)2', 92.948), ('Co(NO3)2·6H2O', 291.035)],
+            'Ni': [('NiO', 74.692), ('Ni(OH)2', 92.708), ('Ni(NO3)2·6H2O', 290.795)],
+            'La': [('La2O3', 325.809), ('La(OH)3', 189.917), ('La(NO3)3·6H2O', 433.012)],
+            'Ag': [('Ag2O', 231.735), ('AgNO3', 169.873)],
+        }
+        db = {}
+        for sym, mass in self.mass_data.items():
+            comps = CompoundStore((smart_format_formula(f), round(m, 3)) for f, m in raw_compounds.get(sym, ()))
+            db[sym] = {'name': self.name_map.get(sym, sym), 'mass': round(mass, 3), 'compounds': comps}
+        return db
+
+    def load_custom_data(self):
+        """合并用户修改；文件损坏（无法解析）时改名备份并记录 load_error，而不是静默丢弃。
+
+        读取出错（如网络盘暂时不可用）时文件保持原样，只记录 load_error 并置 source_unread，
+        此后 save_custom_data 会先重新读取，避免用只含新修改的差异覆盖整个用户库。
+        """
+        if not os.path.exists(self.filename): return
+        try:
+            with open(self.filename, 'rb') as f: raw = f.read()
+        except OSError as e:
+            self.load_error = (e, None); self.source_unread = True; return
+        self.source_unread = False
+        try:
+            custom = json.loads(raw.decode('utf-8'))
+            if custom.get('version') == 2:
+                for sym, diff in custom.get('elements', {}).items():
+                    if sym not in self.elements: continue
+                    comps = self.elements[sym]['compounds']
+                    for f in diff.get('removed', []): comps.remove(f)
+                    for f, m in diff.get('added', []):
+                        comps.remove(f); comps.add(f, m)  # 同键条目以文件中的分子量为准
+            else:  # 旧版全量格式
+                for k, v in custom.items():
+                    if k in self.elements:
+                        self.elements[k].update(v)
+                        self.elements[k]['compounds'] = CompoundStore(self.elements[k].get('compounds', []))
+        except (ValueError, TypeError, AttributeError) as e:
+            backup = f"{self.filename}.corrupt-{datetime.now().strftime('%Y%m%d%H%M%S')}"
+            try: os.replace(self.filename, backup)
+            except OSError: backup = None
+            self.load_error = (e, backup)
+
+    def custom_diff(self):
+        """只记录相对内置数据库的增删（按规范化键比较），内置数据更新后用户修改仍然有效；
+        分子量改动记为先删后增，文件格式与 version 2 保持一致"""
+        out = {}; empty = CompoundStore()
+        for sym, info in self.elements.items():
+            base = self.builtin.get(sym, empty); cur = info['compounds']
+            added = [[c.formula, c.mass] for k, c in cur.items() if (b := base.get_key(k)) is None or b.mass != c.mass]
+            removed = [b.formula for k, b in base.items() if (c := cur.get_key(k)) is None or c.mass != b.mass]
+            if added or removed: out[sym] = {'added': added, 'removed': removed}
+        return {'version': 2, 'elements': out}
+
+    @property
+    def index(self):
+        """全库检索索引，首次使用时构建，之后随 add_compound/remove_compound 增量更新。
+
+        构建耗时较长（6 万条约数秒），只在读锁内复制条目，构建本身不持锁；期间的增删记入
+        _index_log，在写锁内重放后再换入，因此构建时界面和服务的读写不会被阻塞。
+        """
+        while self._index is None:
+            with self._index_build:
+                if self._index is not None: break
+                with self.lock.read():
+                    rows = [(sym, c.formula, c.mass) for sym, info in self.elements.items() for c in info['compounds']]
+                    self._index_log = []; gen = self._index_gen
+                index = CompoundIndex(self.engine); index.add_many(rows)
+                with self.lock.write():
+                    if gen != self._index_gen: continue  # 构建期间索引被整体作废（库被重新合并），重来
+                    for method, args in self._index_log: getattr(index, method)(*args)
+                    self._index = index; self._index_log = None
+        return self._index
+
+    def _index_apply(self, method, *args):
+        """写锁内调用：索引已建好时直接更新，正在构建时记入日志"""
+        if self._index is not None: getattr(self._index, method)(*args)
+        elif self._index_log is not None: self._index_log.append((method, args))
+
+    def _invalidate_index(self):
+        """写锁内调用：条目被整体替换后作废索引，下次使用时重建"""
+        self._index = None; self._index_log = None; self._index_gen += 1
+
+    @property
+    def index_ready(self): return self._index is not None
+
+    def get_compound(self, sym, formula):
+        with self.lock.read(): return self.elements[sym]['compounds'].get(formula)
+
+    def add_compound(self, sym, formula, mass):
+        """同一元素下已有相同规范化化学式时不重复添加，返回是否新增"""
+        with self.lock.write():
+            if not self.elements[sym]['compounds'].add(formula, mass): return False
+            self._index_apply('add', sym, formula, mass)
+            return True
+
+    def add_compounds(self, rows):
+        """批量追加 [(元素, 化学式, 分子量)]，跳过重复条目，索引只重排一次；返回新增条数"""
+        with self.lock.write():
+            added = [(sym, f, m) for sym, f, m in rows if self.elements[sym]['compounds'].add(f, m)]
+            self._index_apply('add_many', added)
+            return len(added)
+
+    def remove_compound(self, sym, formula):
+        """按规范化键删除，返回是否存在"""
+        with self.lock.write():
+            c = self.elements[sym]['compounds'].remove(formula)
+            if c is not None: self._index_apply('remove', sym, c.formula)
+            return c is not None
+
+    def search_compounds(self, text, limit=20):
+        """可与写入并发调用的检索接口（读锁）"""
+        index = self.index
+        with self.lock.read(): return index.search(text, limit)
+
+    def compounds_of(self, element):
+        index = self.index
+        with self.lock.read(): return index.by_element(element)
+
+    def validate_compounds(self, tol=0.05):
+        """用原子质量表核对库内所有化合物，返回 [(元素, 化学式, 记录值, 计算值)]，计算值为 None 表示无法解析"""
+        with self.lock.read(): items = [(sym, f, m) for sym, info in self.elements.items() for f, m in info.get('compounds', [])]
+        calc = self.engine.batch_molar_mass([f for _, f, _ in items])
+        return [(sym, f, m, c) for (sym, f, m), c in zip(items, calc) if c is None or abs(c - m) > tol]
+
+    def recompute_compounds(self):
+        """按原子质量表重算全部可解析化合物的分子量，返回被修改的条数；有修改时索引作废重建，需调用方另行 save_custom_data"""
+        changed = 0
+        with self.lock.write():
+            for info in self.elements.values():
+                comps = list(info.get('compounds', ()))
+                calc = self.engine.batch_molar_mass([r.formula for r in comps])
+                for r, c in zip(comps, calc):
+                    if c is not None and c != r.mass: r.mass = c; changed += 1
+            if changed: self._invalidate_index()
+        return changed
+
+    @timed("db.save")
+    def save_custom_data(self):
+        """在调用线程中生成快照（计入 db.save）；挂接了后台写入线程时异步落盘，否则同步原子写入（落盘计入 db.write）"""
+        if self.source_unread:
+            with self.lock.write():
+                if self.source_unread: self.load_custom_data()
+                if self.source_unread: raise OSError(f"{self.filename} 仍无法读取，为避免覆盖已有的自定义数据，本次修改未保存：{self.load_error[0]}")
+                self._invalidate_index()  # 合并了文件中的条目，索引下次使用时重建
+            self.load_error = None
+        with self.lock.read(): data = self.custom_diff()
+        @timed("db.write")
+        def write(): self.invalidate_snapshot(); atomic_write_json(self.filename, data)
+        if self.writer: self.writer.submit(self.filename, write)
+        else: write()
+
+# ==================== 3. 前驱体质量计算 ====================
+
+# 批量计算的逐行错误标志位
+ERR_LOADING_HIGH, ERR_LOADING_NEG, ERR_SUPPORT, ERR_MX, ERR_MZ, ERR_LOADING_NAN = 1, 2, 4, 8, 16, 32
+_ERR_TEXT = [(ERR_LOADING_HIGH, "负载量≥100%"), (ERR_LOADING_NEG, "负载量<0"), (ERR_LOADING_NAN, "负载量无效"),
+             (ERR_SUPPORT, "载体质量≤0"), (ERR_MX, "Mx 无效"), (ERR_MZ, "Mz 无效")]
+
+def describe_flags(code):
+    return "；".join(t for bit, t in _ERR_TEXT if code & bit)
+
+def _row_flags(l, s, mx, mz):
+    code = 0
+    if l != l: code |= ERR_LOADING_NAN  # 缺失或无法解析的负载量（nan）单独标出
+    elif l >= 100: code |= ERR_LOADING_HIGH
+    elif l < 0: code |= ERR_LOADING_NEG
+    if not s > 0: code |= ERR_SUPPORT
+    if not mx > 0: code |= ERR_MX
+    if not mz > 0: code |= ERR_MZ
+    return code
+
+def precursor_mass(loading, support, mx, mz):
+    """所需前驱体质量 = (s / (1 - l/100) - s) / (Mx / Mz)，输入无效时抛出 ValueError"""
+    code = _row_flags(loading, support, mx, mz)
+    if code: raise ValueError(describe_flags(code))
+    return (support / (1 - loading / 100) - support) / (mx / mz)
+
+def batch_precursor_mass(loading, support, mx, mz):
+    """向量化批量计算，返回 (质量列表, 错误标志列表)；无效行质量为 nan，不影响其余行"""
+    np = _numpy()
+    if np is None:
+        masses, flags = [], []
+        for l, s, x, z in zip(loading, support, mx, mz):
+            code = _row_flags(l, s, x, z)
+            masses.append(float('nan') if code else (s / (1 - l / 100) - s) / (x / z)); flags.append(code)
+        return masses, flags
+    l = np.asarray(loading, dtype=float); s = np.asarray(support, dtype=float)
+    x = np.asarray(mx, dtype=float); z = np.asarray(mz, dtype=float)
+    # 质量的比较式写成取反形式，使 nan 输入同样被标记；负载量的 nan 单独标出
+    flags = ((l >= 100) * ERR_LOADING_HIGH | (l < 0) * ERR_LOADING_NEG | np.isnan(l) * ERR_LOADING_NAN | ~(s > 0) * ERR_SUPPORT
+             | ~(x > 0) * ERR_MX | ~(z > 0) * ERR_MZ).astype(np.int8)
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        masses = (s / (1 - l / 100) - s) * z / x
+    masses[flags != 0] = np.nan
+    return masses, flags
+
+def recipe_precursor_masses(support, components):
+    """多组分配方：components 为 [(负载量 wt.%, Mx, Mz)]，各组分负载量均以催化剂总质量为基准。
+
+    活性组分质量 a_i 满足线性方程组 a_i = l_i/100 · (s + Σa_j)，其解为
+    a_i = l_i/100 · s / (1 - Σl_j/100)；前驱体质量为 a_i · Mz_i / Mx_i。
+    单组分时与 precursor_mass 一致；输入无效时抛出 ValueError。
+    """
+    if not components: raise ValueError("至少需要一个组分")
+    total = sum(l for l, _, _ in components); code = _row_flags(total, support, 1, 1)
+    errs = [describe_flags(code)] if code else []
+    for n, (l, x, z) in enumerate(components, 1):
+        code = _row_flags(l, 1, x, z) & ~ERR_LOADING_HIGH
+        if code: errs.append(f"组分{n}：{describe_flags(code)}")
+    if errs: raise ValueError("；".join(errs))
+    base = support / (1 - total / 100)
+    return [l / 100 * base * z / x for l, x, z in components]
+
+def batch_recipe_masses(support, loading, mx, mz):
+    """批量求解多组分配方：support 形状 (R,)，loading/mx/mz 形状 (R, N)，组分不足 N 的行以负载量 0 补齐。
+
+    返回 (前驱体质量 (R, N), 每个配方的错误标志 (R,))；无效配方整行为 nan。
+    """
+    np = _numpy()
+    if np is None:
+        masses, flags = [], []
+        for s, ls, xs, zs in zip(support, loading, mx, mz):
+            comps = [(l, x, z) for l, x, z in zip(ls, xs, zs) if l]
+            code = _row_flags(sum(ls), s, 1, 1)
+            for l, x, z in comps: code |= _row_flags(l, 1, x, z) & ~ERR_LOADING_HIGH
+            flags.append(code)
+            if code: masses.append([float('nan')] * len(ls)); continue
+            base = s / (1 - sum(ls) / 100)
+            masses.append([l / 100 * base * z / x if l else 0.0 for l, x, z in zip(ls, xs, zs)])
+        return masses, flags
+    s = np.asarray(support, dtype=float); l = np.asarray(loading, dtype=float)
+    x = np.asarray(mx, dtype=float); z = np.asarray(mz, dtype=float)
+    total = l.sum(axis=1); used = l != 0
+    flags = ((total >= 100) * ERR_LOADING_HIGH | (l < 0).any(axis=1) * ERR_LOADING_NEG | np.isnan(total) * ERR_LOADING_NAN
+             | ~(s > 0) * ERR_SUPPORT | (used & ~(x > 0)).any(axis=1) * ERR_MX | (used & ~(z > 0)).any(axis=1) * ERR_MZ).astype(np.int8)
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        masses = np.where(used, l / 100 * (s / (1 - total / 100))[:, None] * z / x, 0.0)
+    masses[flags != 0] = np.nan
+    return masses, flags
+
+def parse_range(spec):
+    """解析 '1:10:0.5'（含端点）或 '1,2,5' 形式的取值列表"""
+    if ':' in spec:
+        start, stop, step = (float(v) for v in spec.split(':'))
+        if step <= 0: raise ValueError("步长必须为正数")
+        n = int((stop - start) / step + 1e-9) + 1
+        return [round(start + k * step, 10) for k in range(max(n, 0))]
+    return [float(v) for v in spec.split(',') if v.strip()]
+
+def sweep_chunks(loadings, supports, precursors, chunk_size=65536):
+    """负载量 × 载体质量 × 前驱体 的笛卡尔组合，按块生成 (l, s, mx, mz, 前驱体序号) 列"""
+    nl, ns, npre = len(loadings), len(supports), len(precursors)
+    total = nl * ns * npre
+    mx_all = [p[0] for p in precursors]; mz_all = [p[1] for p in precursors]; np = _numpy()
+    for start in range(0, total, chunk_size):
+        stop = min(start + chunk_size, total)
+        if np is not None:
+            idx = np.arange(start, stop)
+            il, rest = np.divmod(idx, ns * npre); isup, ip = np.divmod(rest, npre)
+            yield (np.asarray(loadings, dtype=float)[il], np.asarray(supports, dtype=float)[isup],
+                   np.asarray(mx_all, dtype=float)[ip], np.asarray(mz_all, dtype=float)[ip], ip)
+        else:
+            idx = range(start, stop)
+            il = [i // (ns * npre) for i in idx]; isup = [i // npre % ns for i in idx]; ip = [i % npre for i in idx]
+            yield ([loadings[i] for i in il], [supports[i] for i in isup],
+                   [mx_all[i] for i in ip], [mz_all[i] for i in ip], ip)
+
+# ==================== 4. 历史记录存储 (SQLite) ====================
+
+HISTORY_COLUMNS = ("id", "timestamp", "loading", "support", "mx", "mz", "mx_name", "mz_name", "precursor_mass", "components")
+
+def _legacy_num(v):
+    """旧版 JSON 中数值以字符串保存（如 '7.0%'），迁移时转为浮点数"""
+    try: return float(str(v).strip().rstrip('%'))
+    except ValueError: return None
+
+class HistoryStore:
+    """计算历史：自增主键作为稳定行 ID，追加为单条 INSERT，按时间/元素/前驱体建索引。
+
+    默认使用回滚日志：工作站的配置目录常在网络盘上，SQLite 的 WAL 模式不支持网络文件系统；
+    确认数据库位于本地磁盘时可传 wal=True。
+    """
+    def __init__(self, path="calc_history.db", legacy_json="calc_history.json", engine=None, wal=False):
+        self.path = path; self.engine = engine; self._lock = threading.RLock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        with self._lock, self.conn:
+            # 日志模式会写入文件本身，显式设置以便把旧版本留下的 WAL 数据库转回回滚日志
+            self.conn.execute(f"PRAGMA journal_mode={'WAL' if wal else 'DELETE'}")
+            self.conn.executescript("""
+                CREATE TABLE IF NOT EXISTS history (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp TEXT NOT NULL,
+                    loading REAL, support REAL, mx REAL, mz REAL,
+                    mx_name TEXT, mz_name TEXT, precursor_mass REAL);
+                CREATE TABLE IF NOT EXISTS history_element (
+                    hid INTEGER NOT NULL, element TEXT NOT NULL);
+                CREATE TABLE IF NOT EXISTS history_precursor (
+                    hid INTEGER NOT NULL, name TEXT NOT NULL);
+                CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+                CREATE INDEX IF NOT EXISTS idx_history_ts ON history(timestamp);
+                CREATE INDEX IF NOT EXISTS idx_history_mz ON history(mz_name);
+                CREATE INDEX IF NOT EXISTS idx_history_element ON history_element(element, hid);
+                CREATE INDEX IF NOT EXISTS idx_history_element_hid ON history_element(hid);
+                CREATE INDEX IF NOT EXISTS idx_history_precursor ON history_precursor(name, hid);
+                CREATE INDEX IF NOT EXISTS idx_history_precursor_hid ON history_precursor(hid);
+            """)
+            if 'components' not in {r[1] for r in self.conn.execute("PRAGMA table_info(history)")}:
+                self.conn.execute("ALTER TABLE history ADD COLUMN components TEXT")
+        if legacy_json: self.migrate_json(legacy_json)
+
+    def _elements(self, *names):
+        if self.engine is None: return set()
+        found = set()
+        for n in names:
+            try: found.update(self.engine.parse(n)[1])
+            except ValueError: pass
+        return found
+
+    def _insert(self, rec):
+        comps = rec.get('components') or []
+        cur = self.conn.execute(
+            "INSERT INTO history (timestamp, loading, support, mx, mz, mx_name, mz_name, precursor_mass, components) VALUES (?,?,?,?,?,?,?,?,?)",
+            (rec.get('timestamp') or datetime.now().strftime("%Y-%m-%d %H:%M:%S"), rec.get('loading'), rec.get('support'),
+             rec.get('mx'), rec.get('mz'), rec.get('mx_name'), rec.get('mz_name'), rec.get('precursor_mass'),
+             json.dumps(comps, ensure_ascii=False) if comps else None))
+        hid = cur.lastrowid
+        names = [rec.get('mx_name'), rec.get('mz_name')] + [n for c in comps for n in (c.get('mx_name'), c.get('mz_name'))]
+        self.conn.executemany("INSERT INTO history_element (hid, element) VALUES (?, ?)", [(hid, e) for e in self._elements(*names)])
+        self.conn.executemany("INSERT INTO history_precursor (hid, name) VALUES (?, ?)",
+                              [(hid, n) for n in {c.get('mz_name') for c in comps} if n])
+        return hid
+
+    def append_recipe(self, support, components, timestamp=None):
+        """多组分配方整体存为一条记录；components 为 [{loading, mx, mz, mx_name, mz_name, precursor_mass}]"""
+        return self.append({'timestamp': timestamp, 'support': support,
+                            'loading': round(sum(c['loading'] for c in components), 6),
+                            'mx_name': "+".join(str(c.get('mx_name', '-')) for c in components),
+                            'mz_name': "+".join(str(c.get('mz_name', '-')) for c in components),
+                            'precursor_mass': round(sum(c['precursor_mass'] for c in components), 3),
+                            'components': components})
+
+    @staticmethod
+    def _row(r):
+        d = dict(r)
+        if d.get('components'): d['components'] = json.loads(d['components'])
+        return d
+
+    @timed("history.append")
+    def append(self, rec):
+        """追加一条记录，返回其行 ID"""
+        with self._lock, self.conn: return self._insert(rec)
+
+    @timed("history.append_many")
+    def append_many(self, recs):
+        with self._lock, self.conn: return [self._insert(r) for r in recs]
+
+    def delete(self, hid):
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM history_element WHERE hid = ?", (hid,))
+            self.conn.execute("DELETE FROM history_precursor WHERE hid = ?", (hid,))
+            return self.conn.execute("DELETE FROM history WHERE id = ?", (hid,)).rowcount > 0
+
+    def get(self, hid):
+        with self._lock: row = self.conn.execute("SELECT * FROM history WHERE id = ?", (hid,)).fetchone()
+        return self._row(row) if row else None
+
+    def _where(self, start=None, end=None, element=None, precursor=None, before_id=None):
+        sql, args = [], []
+        if start: sql.append("timestamp >= ?"); args.append(start)
+        if end: sql.append("timestamp <= ?"); args.append(end + " 23:59:59" if len(end) == 10 else end)
+        if element: sql.append("id IN (SELECT hid FROM history_element WHERE element = ?)"); args.append(element)
+        if precursor:
+            name = smart_format_formula(precursor.strip())
+            sql.append("(mz_name = ? OR id IN (SELECT hid FROM history_precursor WHERE name = ?))"); args += [name, name]
+        if before_id is not None: sql.append("id < ?"); args.append(before_id)
+        return (" WHERE " + " AND ".join(sql) if sql else ""), args
+
+    @timed("history.query")
+    def query(self, limit=200, **filters):
+        """按 ID 倒序（新记录在前）分页查询；翻页时传入上一页最后一条的 ID 作为 before_id"""
+        where, args = self._where(**filters)
+        with self._lock:
+            rows = self.conn.execute(f"SELECT * FROM history{where} ORDER BY id DESC LIMIT ?", (*args, limit)).fetchall()
+        return [self._row(r) for r in rows]
+
+    def iter_records(self, chunk=1000, **filters):
+        """按块遍历全部匹配记录，内存占用与总条数无关"""
+        before = filters.pop('before_id', None)
+        while True:
+            rows = self.query(limit=chunk, before_id=before, **filters)
+            if not rows: return
+            yield from rows
+            before = rows[-1]['id']
+
+    def count(self, **filters):
+        where, args = self._where(**filters)
+        with self._lock: return self.conn.execute(f"SELECT COUNT(*) FROM history{where}", args).fetchone()[0]
+
+    def migrate_json(self, path):
+        """首次运行时导入旧版 calc_history.json（旧文件保留不动）"""
+        with self._lock:
+            if self.conn.execute("SELECT 1 FROM meta WHERE key = 'json_migrated'").fetchone(): return 0
+            recs = []
+            if os.path.exists(path):
+                try:
+                    with open(path, 'r', encoding='utf-8') as f: legacy = json.load(f)
+                except (OSError, ValueError): legacy = None
+                if legacy is None: return 0  # 文件损坏时不做标记，保留下次重试的机会
+                for r in reversed(legacy):  # 旧文件新记录在前，按时间顺序写入以保持 ID 递增
+                    i = r.get('inputs', {})
+                    recs.append({'timestamp': r.get('timestamp'), 'loading': _legacy_num(i.get('loading')),
+                                 'support': _legacy_num(i.get('support')), 'mx': _legacy_num(i.get('mx')),
+                                 'mz': _legacy_num(i.get('mz')), 'mx_name': i.get('mx_name'), 'mz_name': i.get('mz_name'),
+                                 'precursor_mass': _legacy_num(r.get('results', {}).get('precursor_mass'))})
+            with self.conn:
+                for r in recs: self._insert(r)
+                self.conn.execute("INSERT INTO meta (key, value) VALUES ('json_migrated', ?)", (str(len(recs)),))
+            return len(recs)
+
+    def close(self):
+        with self._lock: self.conn.close()
+
+# ==================== 5. 后台写入 ====================
+
+def _atomic_write_bytes(path, payload):
+    """先写同目录临时文件并 fsync，再原子替换，写到一半崩溃也不会破坏原文件"""
+    fd, tmp = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(payload); f.flush(); os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try: os.remove(tmp)
+        except OSError: pass
+        raise
+
+def atomic_write_json(path, data):
+    _atomic_write_bytes(path, json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+
+class RWLock:
+    """读写锁：读者可并发，写者独占；有写者排队时新读者等待，避免写者饿死。不可重入"""
+    def __init__(self):
+        self._cond = threading.Condition(); self._readers = 0; self._writer = False; self._waiting = 0
+
+    @contextlib.contextmanager
+    def read(self):
+        with self._cond:
+            while self._writer or self._waiting: self._cond.wait()
+            self._readers += 1
+        try: yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers: self._cond.notify_all()
+
+    @contextlib.contextmanager
+    def write(self):
+        with self._cond:
+            self._waiting += 1
+            while self._writer or self._readers: self._cond.wait()
+            self._waiting -= 1; self._writer = True
+        try: yield
+        finally:
+            with self._cond: self._writer = False; self._cond.notify_all()
+
+class PersistWorker:
+    """写入合并线程：同一 key 在 delay 秒内的多次提交只执行最后一次"""
+    def __init__(self, delay=0.3, on_error=None):
+        self.delay = delay; self.on_error = on_error
+        self._pending = {}; self._cond = threading.Condition(); self._busy = False; self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="persist-worker", daemon=True); self._thread.start()
+
+    def submit(self, key, fn):
+        with self._cond:
+            if self._stopped: raise RuntimeError("写入线程已停止")
+            self._pending[key] = fn; self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._stopped: self._cond.wait()
+                if not self._pending: return
+            # 先等待一小段时间，把连续的编辑合并成一次写入
+            if not self._stopped: time.sleep(self.delay)
+            with self._cond: jobs = list(self._pending.values()); self._pending.clear(); self._busy = True
+            for fn in jobs:
+                try: fn()
+                except Exception as e:
+                    if self.on_error: self.on_error(e)
+            with self._cond: self._busy = False; self._cond.notify_all()
+
+    def flush(self, timeout=None):
+        """阻塞直到所有已提交的写入完成"""
+        with self._cond:
+            self._cond.notify_all()
+            return self._cond.wait_for(lambda: not self._pending and not self._busy, timeout)
+
+    def stop(self, timeout=None):
+        """停止前执行完已提交的写入；超时仍未完成时返回 False（线程为 daemon，不阻止退出）"""
+        with self._cond: self._stopped = True; self._cond.notify_all()
+        self._thread.join(timeout)
+        return not self._thread.is_alive()
+
+# ==================== 6. 化合物检索索引 ====================
+
+class CompoundIndex:
+    """全库化合物检索：规范化化学式的有序表支持前缀查找，三元组倒排支持子串查找，另有元素 → 化合物反查"""
+    def __init__(self, engine=None):
+        self.engine = engine
+        self._entries = {}            # id -> (元素, 化学式, 分子量)
+        self._keys = {}               # id -> 检索键
+        self._ids = {}                # (元素, 化学式) -> id
+        self._sorted = []             # [(检索键, id)]，按键有序
+        self._grams = {}              # 三元组 -> {id}
+        self._by_element = {}         # 元素 -> {id}
+        self._next_id = 0
+
+    @staticmethod
+    def search_key(formula): return normalize_formula(formula).lower()
+
+    @staticmethod
+    def _trigrams(key): return {key[i:i + 3] for i in range(len(key) - 2)}
+
+    def build(self, elements):
+        return self.add_many((sym, f, m) for sym, info in elements.items() for f, m in info.get('compounds', []))
+
+    def add_many(self, rows):
+        """批量登记 (元素, 化学式, 分子量)：最后统一排序一次，避免逐条 insort"""
+        bulk = []
+        for sym, f, m in rows:
+            if (sym, f) in self._ids: continue
+            cid = self._next_id; self._next_id += 1; key = self.search_key(f)
+            self._entries[cid] = (sym, f, m); self._keys[cid] = key; self._ids[(sym, f)] = cid; bulk.append((key, cid))
+            for g in self._trigrams(key): self._grams.setdefault(g, set()).add(cid)
+            for e in self._elements_of(sym, f): self._by_element.setdefault(e, set()).add(cid)
+        self._sorted.extend(bulk); self._sorted.sort()
+        return self
+
+    def _elements_of(self, sym, formula):
+        found = {sym}
+        if self.engine is not None:
+            try: found.update(self.engine.parse(formula)[1])
+            except ValueError: pass
+        return found
+
+    def add(self, sym, formula, mass):
+        if (sym, formula) in self._ids: self.remove(sym, formula)
+        cid = self._next_id; self._next_id += 1
+        key = self.search_key(formula)
+        self._entries[cid] = (sym, formula, mass); self._keys[cid] = key; self._ids[(sym, formula)] = cid
+        bisect.insort(self._sorted, (key, cid))
+        for g in self._trigrams(key): self._grams.setdefault(g, set()).add(cid)
+        for e in self._elements_of(sym, formula): self._by_element.setdefault(e, set()).add(cid)
+
+    def remove(self, sym, formula):
+        cid = self._ids.pop((sym, formula), None)
+        if cid is None: return False
+        del self._entries[cid]; key = self._keys.pop(cid)
+        i = bisect.bisect_left(self._sorted, (key, cid))
+        if i < len(self._sorted) and self._sorted[i] == (key, cid): del self._sorted[i]
+        for g in self._trigrams(key):
+            ids = self._grams.get(g)
+            if ids is not None:
+                ids.discard(cid)
+                if not ids: del self._grams[g]
+        for e in self._elements_of(sym, formula):
+            ids = self._by_element.get(e)
+            if ids is not None: ids.discard(cid)
+        return True
+
+    def __len__(self): return len(self._entries)
+
+    def _prefix_ids(self, key):
+        i = bisect.bisect_left(self._sorted, (key, -1))
+        while i < len(self._sorted) and self._sorted[i][0].startswith(key):
+            yield self._sorted[i][1]; i += 1
+
+    def search(self, text, limit=20):
+        """先前缀后子串，同一化学式只返回一次；结果为 [(元素, 化学式, 分子量)]"""
+        key = self.search_key(text)
+        if not key: return []
+        out, seen = [], set()
+        def take(ids):
+            for cid in ids:
+                sym, f, m = self._entries[cid]
+                if f in seen: continue
+                seen.add(f); out.append((sym, f, m))
+                if len(out) >= limit: return True
+            return False
+        if take(self._prefix_ids(key)): return out
+        if len(key) >= 3:
+            cands = None
+            for g in sorted(self._trigrams(key), key=lambda g: len(self._grams.get(g, ()))):
+                cands = self._grams.get(g, set()) if cands is None else cands & self._grams.get(g, set())
+                if not cands: return out
+            pool = ((c, self._keys[c]) for c in cands)
+        else:
+            pool = self._keys.items()
+        # 只收集有限数量的命中再排序（短的优先），常见子串如 h2o 不必排序全库
+        hits = []
+        for c, k in pool:
+            if key in k:
+                hits.append((len(k), k, c))
+                if len(hits) >= limit * 10: break
+        take(c for _, _, c in sorted(hits))
+        return out
+
+    def by_element(self, element):
+        """含有该元素的全部化合物（包括多金属前驱体）"""
+        return sorted((self._entries[c] for c in self._by_element.get(element, ())), key=lambda e: e[1])
+
+# ==================== 7. 批量导入 ====================
+
+_IMPORT_SPLIT = re.compile(r'[,\t，]')
+
+class ImportReport:
+    def __init__(self):
+        self.accepted = []      # [(元素, 化学式, 分子量)]
+        self.rejected = []      # [(行号, 原始内容, 原因)]
+        self.cancelled = False
+
+    def write_rejections(self, path):
+        with open(path, 'w', newline='', encoding='utf-8-sig') as f:
+            w = csv.writer(f); w.writerow(["行号", "原始内容", "原因"]); w.writerows(self.rejected)
+
+def import_compounds(path, db, check_mass=False, tol=0.5, chunk_size=5000, progress=None, cancel=None):
+    """流式解析 元素符号,化学式,分子量 格式的 CSV/TXT，只返回结果不修改数据库。
+
+    逐块处理：化学式经 smart_format_formula 规范化，与库内及文件内已有条目去重；
+    check_mass 时按原子质量表核对分子量，偏差超过 tol 的行拒收。
+    progress(已读比例, 接受数, 拒收数) 每块调用一次；cancel() 返回真时中止。
+    """
+    report = ImportReport(); total = os.path.getsize(path) or 1
+    seen = set()  # 文件内已接受的 (元素, 规范化键)；与库内条目的重复由 CompoundStore 按键直接判断
+
+    def flush(chunk):
+        need = [f for _, _, _, f, m in chunk if check_mass or m is None]
+        calc = iter(db.engine.batch_molar_mass(need))
+        for no, sym, text, f, m in chunk:
+            if m is None:
+                c = next(calc)
+                if c is None: report.rejected.append((no, text, "缺少分子量且化学式无法解析")); continue
+                m = c
+            elif check_mass:
+                c = next(calc)
+                if c is None or abs(c - m) > tol:
+                    report.rejected.append((no, text, "化学式无法解析" if c is None else f"分子量不符（计算值 {c:.3f}）")); continue
+            k = (sym, normalize_formula(f))
+            if k in seen or f in db.elements[sym]['compounds']: report.rejected.append((no, text, "重复")); continue
+            seen.add(k); report.accepted.append((sym, f, m))
+
+    with open(path, 'rb') as fb:
+        chunk = []; done = 0
+        for no, line in enumerate(fb, 1):
+            done += len(line)
+            text = line.decode('utf-8-sig' if no == 1 else 'utf-8', errors='replace').strip()
+            if not text or text.startswith('#'): continue
+            parts = [p.strip() for p in _IMPORT_SPLIT.split(text)]
+            sym = parts[0]; formula = parts[1] if len(parts) > 1 else ""
+            mass_s = parts[2] if len(parts) > 2 else ""
+            try: mass = round(float(mass_s), 3) if mass_s else None
+            except ValueError:
+                if no == 1: continue  # 表头
+                report.rejected.append((no, text, "分子量不是数字")); continue
+            if sym not in db.elements: report.rejected.append((no, text, f"未知元素符号：{sym}")); continue
+            if not formula: report.rejected.append((no, text, "缺少化学式")); continue
+            chunk.append((no, sym, text, smart_format_formula(formula), mass))
+            if len(chunk) >= chunk_size:
+                flush(chunk); chunk = []
+                if progress: progress(done / total, len(report.accepted), len(report.rejected))
+                if cancel and cancel(): report.cancelled = True; return report
+        flush(chunk)
+    report.rejected.sort()
+    if progress: progress(1.0, len(report.accepted), len(report.rejected))
+    return report
+
+# ==================== 8. 历史导出 ====================
+
+# (字段, 表头, 类型)；数值列按浮点数写出，不再带 "%" 等文本
+EXPORT_COLUMNS = [
+    ("id", "编号", int), ("timestamp", "时间", datetime), ("loading", "负载量(wt.%)", float), ("support", "载体质量(g)", float),
+    ("mx_name", "活性组分(Mx)", str), ("mx", "Mx(g/mol)", float), ("mz_name", "前驱体(Mz)", str), ("mz", "Mz(g/mol)", float),
+    ("precursor_mass", "所需质量(g)", float), ("components", "多组分明细", str),
+]
+EXPORT_FORMATS = {".csv": "csv", ".xlsx": "xlsx", ".parquet": "parquet"}
+_EXPORT_DEPS = {"xlsx": "openpyxl", "parquet": "pyarrow"}
+
+def export_available(fmt):
+    """可选依赖是否已安装（不实际导入）"""
+    import importlib.util
+    dep = _EXPORT_DEPS.get(fmt)
+    return dep is None or importlib.util.find_spec(dep) is not None
+
+def _export_value(r, key, typ):
+    v = r.get(key)
+    if v is None: return None
+    if key == 'components': return json.dumps(v, ensure_ascii=False)
+    if typ is datetime:
+        try: return datetime.strptime(v, "%Y-%m-%d %H:%M:%S")
+        except (TypeError, ValueError): return None
+    return v
+
+class _CsvSink:
+    def __init__(self, path):
+        self.f = open(path, 'w', newline='', encoding='utf-8-sig'); self.w = csv.writer(self.f)
+        self.w.writerow([h for _, h, _ in EXPORT_COLUMNS])
+    def write(self, rows):
+        self.w.writerows([("" if v is None else v.strftime("%Y-%m-%d %H:%M:%S") if isinstance(v, datetime) else v) for v in row] for row in rows)
+    def close(self): self.f.close()
+
+class _XlsxSink:
+    def __init__(self, path):
+        try: import openpyxl
+        except ImportError: raise RuntimeError("导出 XLSX 需要安装 openpyxl")
+        self.path = path; self.wb = openpyxl.Workbook(write_only=True); self.ws = self.wb.create_sheet("计算历史")
+        self.ws.append([h for _, h, _ in EXPORT_COLUMNS])
+    def write(self, rows):
+        for row in rows: self.ws.append(row)
+    def close(self): self.wb.save(self.path)
+
+class _ParquetSink:
+    def __init__(self, path):
+        try: import pyarrow as pa, pyarrow.parquet as pq
+        except ImportError: raise RuntimeError("导出 Parquet 需要安装 pyarrow")
+        types = {int: pa.int64(), float: pa.float64(), str: pa.string(), datetime: pa.timestamp('s')}
+        self.pa = pa; self.schema = pa.schema([(k, types[t]) for k, _, t in EXPORT_COLUMNS])
+        self.writer = pq.ParquetWriter(path, self.schema)
+    def write(self, rows):
+        cols = list(zip(*rows)) if rows else [[] for _ in EXPORT_COLUMNS]
+        self.writer.write_table(self.pa.Table.from_arrays([self.pa.array(c, type=f.type) for c, f in zip(cols, self.schema)], schema=self.schema))
+    def close(self): self.writer.close()
+
+def export_history(store, path, fmt=None, chunk=5000, progress=None, cancel=None, **filters):
+    """按过滤条件分块导出历史记录（CSV / XLSX / Parquet），内存占用只与块大小有关。
+
+    fmt 缺省时按扩展名判断；progress(已导出, 总数) 每块调用一次；cancel() 返回真时中止并删除半成品文件。
+    返回导出条数，取消时返回 None。
+    """
+    fmt = fmt or EXPORT_FORMATS.get(os.path.splitext(path)[1].lower())
+    sinks = {"csv": _CsvSink, "xlsx": _XlsxSink, "parquet": _ParquetSink}
+    if fmt not in sinks: raise ValueError(f"不支持的导出格式：{fmt or path}")
+    total = store.count(**filters); done = 0
+    sink = sinks[fmt](path); ok = False
+    try:
+        batch = []
+        for r in store.iter_records(chunk=chunk, **filters):
+            batch.append([_export_value(r, k, t) for k, _, t in EXPORT_COLUMNS])
+            if len(batch) >= chunk:
+                sink.write(batch); done += len(batch); batch = []
+                if progress: progress(done, total)
+                if cancel and cancel(): return None
+        if batch or done == 0: sink.write(batch); done += len(batch)
+        if progress: progress(done, total)
+        ok = True
+        return done
+    finally:
+        sink.close()
+        if not ok:
+            try: os.remove(path)
+            except OSError: pass
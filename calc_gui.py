@@ -0,0 +1,515 @@
+import tkinter as tk
+from tkinter import ttk, messagebox, filedialog
+from datetime import datetime
+
+import time
+import queue
+import threading
+
+from calc_core import (ElementInfo, HistoryStore, PersistWorker, smart_format_formula, precursor_mass,
+                       recipe_precursor_masses, import_compounds, export_history, export_available, instrumentation, timed)
+
+# 性能预算（毫秒）：冷启动指进程启动到主窗口首次空闲，超出时在状态栏标红。
+# bench.py 的 startup 用例测量其中不依赖显示器的部分（导入、数据库快照加载、历史第一页）：
+# 1,000 / 100,000 个自定义化合物与同等条数历史记录时中位数约 74 / 309 ms（100 万条时约 3.9 s，超出预算），
+# 其余时间留给 Tk 建窗。周期表的两项需要显示器，只能在运行时由 record_perf 实测。
+STARTUP_BUDGET_MS = 1500
+PT_BUILD_BUDGET_MS = 500
+PT_SHOW_BUDGET_MS = 50
+
+# ==================== 1. 周期表 UI ====================
+
+class PeriodicTableWindow(tk.Toplevel):
+    def __init__(self, parent, db, callback):
+        super().__init__(parent); self.title("元素周期表"); self.geometry("1150x920")
+        self.db = db; self.callback = callback; self.current_symbol = None; self.setup_ui()
+        # 关闭时仅隐藏，下次打开直接复用，避免重建上百个按钮
+        self.protocol("WM_DELETE_WINDOW", self.withdraw)
+
+    def show(self):
+        self.deiconify(); self.lift(); self.focus_set()
+
+    @timed("pt.setup_ui")
+    def setup_ui(self):
+        main_frame = ttk.Frame(self, padding=10); main_frame.pack(fill=tk.BOTH, expand=True)
+        style = ttk.Style(); style.configure("Table.Treeview", rowheight=35, font=('微软雅黑', 10))
+
+        pts = [(1,1,"H"),(1,18,"He"),(2,1,"Li"),(2,2,"Be"),(2,13,"B"),(2,14,"C"),(2,15,"N"),(2,16,"O"),(2,17,"F"),(2,18,"Ne"),
+               (3,1,"Na"),(3,2,"Mg"),(3,13,"Al"),(3,14,"Si"),(3,15,"P"),(3,16,"S"),(3,17,"Cl"),(3,18,"Ar"),
+               (4,1,"K"),(4,2,"Ca"),(4,3,"Sc"),(4,4,"Ti"),(4,5,"V"),(4,6,"Cr"),(4,7,"Mn"),(4,8,"Fe"),(4,9,"Co"),(4,10,"Ni"),(4,11,"Cu"),(4,12,"Zn"),(4,13,"Ga"),(4,14,"Ge"),(4,15,"As"),(4,16,"Se"),(4,17,"Br"),(4,18,"Kr"),
+               (5,1,"Rb"),(5,2,"Sr"),(5,3,"Y"),(5,4,"Zr"),(5,5,"Nb"),(5,6,"Mo"),(5,7,"Tc"),(5,8,"Ru"),(5,9,"Rh"),(5,10,"Pd"),(5,11,"Ag"),(5,12,"Cd"),(5,13,"In"),(5,14,"Sn"),(5,15,"Sb"),(5,16,"Te"),(5,17,"I"),(5,18,"Xe"),
+               (6,1,"Cs"),(6,2,"Ba"),(6,3,"*"),(6,4,"Hf"),(6,5,"Ta"),(6,6,"W"),(6,7,"Re"),(6,8,"Os"),(6,9,"Ir"),(6,10,"Pt"),(6,11,"Au"),(6,12,"Hg"),(6,13,"Tl"),(6,14,"Pb"),(6,15,"Bi"),(6,16,"Po"),(6,17,"At"),(6,18,"Rn"),
+               (7,1,"Fr"),(7,2,"Ra"),(7,3,"#"),(7,4,"Rf"),(7,5,"Db"),(7,6,"Sg"),(7,7,"Bh"),(7,8,"Hs"),(7,9,"Mt"),(7,10,"Ds"),(7,11,"Rg"),(7,12,"Cn"),(7,13,"Nh"),(7,14,"Fl"),(7,15,"Mc"),(7,16,"Lv"),(7,17,"Ts"),(7,18,"Og")]
+        for r, c, s in pts: self.make_btn(main_frame, r, c, s)
+
+        for i, s in enumerate(["La","Ce","Pr","Nd","Pm","Sm","Eu","Gd","Tb","Dy","Ho","Er","Tm","Yb","Lu"]): self.make_btn(main_frame, 9, i+4, s)
+        for i, s in enumerate(["Ac","Th","Pa","U","Np","Pu","Am","Cm","Bk","Cf","Es","Fm","Md","No","Lr"]): self.make_btn(main_frame, 10, i+4, s)
+
+        detail_frame = ttk.LabelFrame(main_frame, text=" 物质数据详情 (保留3位小数) ", padding=10)
+        detail_frame.grid(row=11, column=1, columnspan=18, sticky="nsew", pady=15)
+        self.tree = ttk.Treeview(detail_frame, columns=("f", "m"), show='headings', height=8, style="Table.Treeview")
+        self.tree.heading("f", text="物质化学式"); self.tree.heading("m", text="相对质量 (g/mol)"); self.tree.column("f", width=400); self.tree.pack(side=tk.LEFT, padx=10, fill=tk.Y)
+        
+        op_panel = ttk.Frame(detail_frame); op_panel.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.cur_lab = tk.Label(op_panel, text="请点击元素按钮", font=('微软雅黑', 14, 'bold'), fg="#C0392B"); self.cur_lab.pack(anchor=tk.W, pady=5)
+        
+        btn_box = ttk.Frame(op_panel); btn_box.pack(fill=tk.X, pady=10)
+        ttk.Button(btn_box, text=" 填入 Mx (活性) ", command=lambda: self.fill('mx')).pack(side=tk.LEFT, padx=2)
+        ttk.Button(btn_box, text=" 填入 Mz (前驱体) ", command=lambda: self.fill('mz')).pack(side=tk.LEFT, padx=2)
+        ttk.Button(btn_box, text=" 删除选中行 ", command=self.delete_comp).pack(side=tk.LEFT, padx=2)
+        
+        self.add_box = ttk.Entry(op_panel); self.add_box.pack(fill=tk.X, pady=5)
+        ttk.Button(op_panel, text="保存至本地数据库", command=self.add_comp).pack(anchor=tk.E)
+        ttk.Button(op_panel, text="从 CSV/TXT 批量导入", command=self.import_file).pack(anchor=tk.E, pady=5)
+
+    def make_btn(self, p, r, c, s):
+        if s in ["*", "#"]: tk.Label(p, text=s).grid(row=r, column=c); return
+        b = tk.Button(p, text=s, width=5, font=('Arial', 9, 'bold'), bg="#ECF0F1", relief="ridge", command=lambda: self.on_click(s)); b.grid(row=r, column=c, padx=1, pady=1)
+
+    @timed("pt.on_click")
+    def on_click(self, s):
+        self.current_symbol = s
+        name = self.db.elements[s]['name']
+        self.cur_lab.config(text=f"当前选中元素：{s}（{name}）")
+        for i in self.tree.get_children(): self.tree.delete(i)
+        atom_mass = f"{self.db.elements[s]['mass']:.3f}"
+        self.tree.insert("", tk.END, values=(s, atom_mass), tags=('atom',))
+        for f, m in self.db.elements[s].get('compounds', []):
+            self.tree.insert("", tk.END, values=(f, f"{m:.3f}"))
+
+    def add_comp(self):
+        if not self.current_symbol: return
+        raw = self.add_box.get()
+        if not raw.strip(): messagebox.showerror("格式错误", "示例：CuO, 79.545 或仅填写 CuO 自动计算"); return
+        f_raw, _, m = raw.partition(',')
+        try: calc_m = self.db.engine.molar_mass(f_raw)
+        except ValueError: calc_m = None
+        try:
+            mass = round(float(m.strip()), 3) if m.strip() else calc_m
+            if mass is None: messagebox.showerror("错误", "无法解析化学式，请手动填写分子量"); return
+        except: messagebox.showerror("错误", "质量必须为数字"); return
+        if calc_m is not None and abs(calc_m - mass) > 0.05:
+            if not messagebox.askyesno("质量不一致", f"按原子质量计算为 {calc_m:.3f}，与填写的 {mass:.3f} 不符，仍要保存吗？"): return
+        std_formula = smart_format_formula(f_raw.strip())
+        if not self.db.add_compound(self.current_symbol, std_formula, mass):
+            old = self.db.get_compound(self.current_symbol, std_formula)
+            messagebox.showinfo("已存在", f"{old.formula}（{old.mass:.3f}）已在列表中，如需修改请先删除", parent=self); return
+        self.save_db(); self.on_click(self.current_symbol); self.add_box.delete(0, tk.END)
+
+    def delete_comp(self):
+        sel = self.tree.selection()
+        if not sel or 'atom' in self.tree.item(sel[0], 'tags'): return
+        f = self.tree.item(sel[0])['values'][0]
+        if messagebox.askyesno("确认", f"确定删除 {f} 吗？"):
+            self.db.remove_compound(self.current_symbol, f)
+            self.save_db(); self.on_click(self.current_symbol)
+
+    def save_db(self):
+        try: self.db.save_custom_data()
+        except OSError as e: messagebox.showerror("保存失败", str(e), parent=self)
+
+    def import_file(self):
+        path = filedialog.askopenfilename(parent=self, filetypes=[("CSV/TXT", "*.csv *.txt"), ("所有文件", "*.*")])
+        if not path: return
+        check = messagebox.askyesno("导入选项", "是否按原子质量核对分子量？\n（偏差超过 0.5 的行将被拒收）", parent=self)
+        def work(report, cancelled):
+            return import_compounds(path, self.db, check_mass=check, cancel=cancelled,
+                                    progress=lambda frac, ok, bad: report(frac, f"已读取 {frac:.0%}，接受 {ok} 条，拒收 {bad} 条"))
+        ProgressDialog(self, "批量导入", work, self.finish_import)
+
+    def finish_import(self, report):
+        if report.cancelled: messagebox.showinfo("导入已取消", "未做任何修改", parent=self); return
+        if report.accepted:
+            self.db.add_compounds(report.accepted); self.save_db()
+            if self.current_symbol: self.on_click(self.current_symbol)
+        msg = f"成功导入 {len(report.accepted)} 条，拒收 {len(report.rejected)} 条"
+        if not report.rejected: messagebox.showinfo("导入完成", msg, parent=self); return
+        if messagebox.askyesno("导入完成", msg + "\n是否保存拒收明细？", parent=self):
+            path = filedialog.asksaveasfilename(parent=self, defaultextension=".csv", filetypes=[("CSV", "*.csv")], initialfile="拒收明细.csv")
+            if path: report.write_rejections(path)
+
+    def fill(self, target):
+        sel = self.tree.selection()
+        if not sel: return
+        item = self.tree.item(sel[0])['values']
+        self.callback(target, item[0], item[1])
+
+class ProgressDialog(tk.Toplevel):
+    """在后台线程执行 work(report, cancelled)，主线程轮询进度；report(比例, 文本) 可在工作线程中调用"""
+    def __init__(self, parent, title, work, on_done):
+        super().__init__(parent); self.title(title); self.resizable(False, False); self.transient(parent)
+        self.name = title; self.on_done = on_done; self.cancelled = False; self.msgs = queue.Queue()
+        self.bar = ttk.Progressbar(self, length=360, maximum=1.0); self.bar.pack(padx=20, pady=(20, 5))
+        self.status = tk.Label(self, text="正在处理…", font=('微软雅黑', 10)); self.status.pack(padx=20)
+        ttk.Button(self, text="取消", command=self.cancel).pack(pady=15)
+        self.protocol("WM_DELETE_WINDOW", self.cancel)
+        self.wait_visibility(); self.grab_set()  # 窗口尚未映射时 grab_set 在 X11 上会报 "grab failed: window not viewable"
+        threading.Thread(target=self.run, args=(work,), daemon=True).start()
+        self.after(100, self.poll)
+
+    def run(self, work):
+        try: self.msgs.put(('done', work(lambda frac, text: self.msgs.put(('progress', frac, text)), lambda: self.cancelled)))
+        except Exception as e: self.msgs.put(('error', e))
+
+    def cancel(self): self.cancelled = True; self.status.config(text="正在取消…")
+
+    def poll(self):
+        while not self.msgs.empty():
+            msg = self.msgs.get()
+            if msg[0] == 'progress':
+                _, frac, text = msg; self.bar['value'] = frac
+                if not self.cancelled: self.status.config(text=text)
+            else:
+                self.grab_release(); self.destroy()
+                if msg[0] == 'done': self.on_done(msg[1])
+                else: messagebox.showerror(f"{self.name}失败", str(msg[1]))  # 窗口已销毁，不能再调用 self.title()
+                return
+        self.after(100, self.poll)
+
+class ExportDialog(tk.Toplevel):
+    """导出条件：日期范围、元素、前驱体；格式由文件扩展名决定"""
+    def __init__(self, app):
+        super().__init__(app.root); self.title("导出历史记录"); self.resizable(False, False); self.transient(app.root); self.app = app
+        box = ttk.Frame(self, padding=15); box.pack(fill=tk.BOTH); self.fields = {}
+        for r, (key, lab, tip) in enumerate([("start", "起始日期", "如 2026-01-01"), ("end", "截止日期", "如 2026-03-31"),
+                                             ("element", "含元素", "如 Ni"), ("precursor", "前驱体", "如 Ni(NO3)2·6H2O")]):
+            ttk.Label(box, text=lab).grid(row=r, column=0, sticky=tk.W, pady=3)
+            e = PlaceholderEntry(box, placeholder=tip, width=24); e.grid(row=r, column=1, padx=8, pady=3); self.fields[key] = e
+        ttk.Label(box, text="留空表示不限", foreground="gray").grid(row=4, column=1, sticky=tk.W)
+        ttk.Button(box, text=" 选择文件并导出 ", command=self.start).grid(row=5, column=0, columnspan=2, pady=(12, 0))
+
+    def start(self):
+        filters = {k: e.get().strip() for k, e in self.fields.items() if not e.is_placeholder and e.get().strip()}
+        types = [("Excel 工作簿", "*.xlsx"), ("CSV", "*.csv"), ("Parquet", "*.parquet")]
+        if not export_available("xlsx"): types.insert(0, types.pop(1))  # 未安装 openpyxl 时默认导出 CSV
+        ext = types[0][1][1:]
+        path = filedialog.asksaveasfilename(parent=self, defaultextension=ext, filetypes=types,
+                                            initialfile=f"催化剂记录_{datetime.now().strftime('%Y%m%d')}{ext}")
+        if not path: return
+        self.destroy()
+        def work(report, cancelled):
+            return export_history(self.app.history, path, cancel=cancelled,
+                                  progress=lambda done, total: report(done / (total or 1), f"已导出 {done} / {total} 条"), **filters)
+        def done(n):
+            if n is None: messagebox.showinfo("导出已取消", "未生成文件")
+            else: messagebox.showinfo("成功", f"导出成功，共 {n} 条")
+        ProgressDialog(self.app.root, "导出", work, done)
+
+# ==================== 2. 主计算界面 ====================
+
+class CatalystCalculator:
+    def __init__(self, root, t0=None):
+        self.root = root; self.root.title("负载型催化剂计算器 Pro"); self.root.geometry("1050x920")
+        self.t0 = t0 or time.perf_counter(); self.perf = {}; self.pt_win = None
+        self.db = ElementInfo(); self.history = HistoryStore(engine=self.db.engine); self.selected_names = {"mx": "-", "mz": "-"}
+        self.oldest_id = None; self.history_exhausted = False; self.page_pending = False
+        # 写入线程不能直接调用 Tk（关闭时主线程在等待它结束，会互相等待），错误经队列由主线程轮询
+        self.write_errors = queue.Queue(); self.db.writer = PersistWorker(on_error=self.write_errors.put)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.setup_ui(); self.update_history()
+        # 检索索引在后台构建，构建完成前输入框不弹出建议
+        threading.Thread(target=lambda: self.db.index, daemon=True).start()
+        self.root.after_idle(lambda: self.record_perf('startup', self.t0, STARTUP_BUDGET_MS)); self.root.after(200, self.poll_write_errors)
+        if self.db.load_error:
+            err, backup = self.db.load_error
+            if self.db.source_unread:
+                messagebox.showwarning("数据库无法读取", f"自定义数据库读取失败（{err}），暂时使用内置数据。\n原文件未做改动，下次保存前会重新读取。")
+            else:
+                messagebox.showwarning("数据库损坏", f"自定义数据库读取失败（{err}），已使用内置数据。" + (f"\n原文件已备份为 {backup}" if backup else ""))
+
+    def setup_ui(self):
+        top = ttk.LabelFrame(self.root, text=" 核心参数输入 ", padding=20); top.pack(fill=tk.X, padx=25, pady=15)
+        self.entries = {}
+        fields = [("负载量 (wt.%)", "loading", "如: 7.0"), ("载体质量 (g)", "support", "如: 10.0"), 
+                  ("活性组分 Mx (g/mol)", "mx", "周期表选择"), ("前驱体 Mz (g/mol)", "mz", "周期表选择")]
+        for i, (lab, key, tip) in enumerate(fields):
+            ttk.Label(top, text=lab).grid(row=0, column=i*2, padx=5)
+            e = PlaceholderEntry(top, placeholder=tip, width=15); e.grid(row=0, column=i*2+1, padx=5); self.entries[key] = e
+            if key in ("mx", "mz"): SuggestionPopup(e, self.db, lambda f, m, k=key: self.fill_entry(k, f, m))
+        
+        # --- 按钮栏：计算按钮单独放右边且醒目 ---
+        ctrl = ttk.Frame(self.root); ctrl.pack(fill=tk.X, padx=25, pady=10)
+        
+        # 左侧辅助按钮
+        ttk.Button(ctrl, text=" 📊 打开元素周期表 ", command=self.open_pt).pack(side=tk.LEFT, padx=5)
+        ttk.Button(ctrl, text=" 🔄 重置输入 ", command=self.reset).pack(side=tk.LEFT, padx=5)
+        ttk.Button(ctrl, text=" 🧪 多组分配方 ", command=lambda: RecipeDialog(self)).pack(side=tk.LEFT, padx=5)
+        
+        # 右侧核心计算按钮 (使用醒目的深蓝色样式)
+        self.calc_btn = tk.Button(
+            ctrl, 
+            text=" 🧮 立即计算结果并复制 ", 
+            command=self.calc,
+            bg="#1F618D", fg="white",       # 深蓝色背景，白色字
+            activebackground="#2E86C1",     # 点击时的颜色
+            activeforeground="white",
+            font=('微软雅黑', 12, 'bold'),     # 字号加大加粗
+            relief="raised",                # 凸起效果
+            cursor="hand2",                 # 鼠标手型
+            padx=25, pady=8                 # 增加内边距使其更大
+        )
+        self.calc_btn.pack(side=tk.RIGHT, padx=5)
+
+        self.res_str = tk.StringVar(value="所需前驱体质量：-- g")
+        tk.Label(self.root, textvariable=self.res_str, font=('微软雅黑', 22, 'bold'), fg="#2980B9").pack(pady=15)
+
+        # 历史记录区域
+        hist_frame = ttk.LabelFrame(self.root, text=" 计算历史记录 ", padding=10); hist_frame.pack(fill=tk.BOTH, expand=True, padx=25, pady=10)
+        
+        hist_tool = ttk.Frame(hist_frame); hist_tool.pack(fill=tk.X, pady=5)
+        ttk.Button(hist_tool, text=" 📥 导出 (Excel/CSV/Parquet) ", command=self.export_to_xls).pack(side=tk.LEFT, padx=5)
+        ttk.Button(hist_tool, text=" 🗑️ 删除选中记录 ", command=self.delete_history_item).pack(side=tk.LEFT, padx=5)
+        ttk.Label(hist_tool, text="*提示：双击或选中后点击删除", font=('微软雅黑', 8), foreground="gray").pack(side=tk.RIGHT)
+
+        self.tree = ttk.Treeview(hist_frame, columns=("t","l","s","mx_n","mz_n","r"), show='headings', height=10)
+        heads = [("t","时间",160),("l","负载量",90),("s","载体(g)",90),("mx_n","Mx(物质)",180),("mz_n","Mz(物质)",180),("r","结果(g)",110)]
+        for cid, txt, wid in heads: self.tree.heading(cid, text=txt); self.tree.column(cid, width=wid)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        vsb = ttk.Scrollbar(hist_frame, command=self.tree.yview); vsb.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.config(yscrollcommand=lambda first, last: (vsb.set(first, last), self.on_history_scroll(last)))
+
+        if instrumentation.enabled: DiagnosticsPanel(self.root).pack(fill=tk.X, padx=25)
+
+        bot = ttk.Frame(self.root, padding=10); bot.pack(fill=tk.X)
+        tk.Label(bot, text="Version 2026.4 | 布局优化：计算按钮置右且醒目", font=('微软雅黑', 9), fg="gray").pack(side=tk.LEFT)
+        self.perf_lab = tk.Label(bot, text="", font=('微软雅黑', 9), fg="gray"); self.perf_lab.pack(side=tk.RIGHT)
+
+    def record_perf(self, key, t_start, budget_ms):
+        ms = (time.perf_counter() - t_start) * 1000; self.perf[key] = ms
+        if instrumentation.enabled: instrumentation.record(f"gui.{key}", ms)
+        labels = {'startup': "启动", 'pt_build': "周期表首开", 'pt_show': "周期表打开"}
+        over = any(self.perf[k] > b for k, b in (('startup', STARTUP_BUDGET_MS), ('pt_build', PT_BUILD_BUDGET_MS), ('pt_show', PT_SHOW_BUDGET_MS)) if k in self.perf)
+        self.perf_lab.config(text=" | ".join(f"{labels[k]} {v:.0f} ms" for k, v in self.perf.items()), fg="#C0392B" if over else "gray")
+
+    def open_pt(self):
+        t = time.perf_counter()
+        if self.pt_win is not None and self.pt_win.winfo_exists():
+            self.pt_win.show(); key, budget = 'pt_show', PT_SHOW_BUDGET_MS
+        else:
+            self.pt_win = PeriodicTableWindow(self.root, self.db, self.fill_entry); key, budget = 'pt_build', PT_BUILD_BUDGET_MS
+        self.root.after_idle(lambda: self.record_perf(key, t, budget))
+    
+    def fill_entry(self, key, formula, val):
+        self.selected_names[key] = str(formula)
+        self.entries[key].delete(0, tk.END)
+        self.entries[key].insert(0, f"{float(val):.3f}")
+        self.entries[key].config(fg='black'); self.entries[key].is_placeholder = False
+
+    def calc(self):
+        try:
+            l = float(self.entries['loading'].get_val()); s = float(self.entries['support'].get_val())
+            mx, mx_n = self.resolve_mass('mx'); mz, mz_n = self.resolve_mass('mz')
+            ans = precursor_mass(l, s, mx, mz); ans_s = f"{ans:.3f}"
+            self.res_str.set(f"所需前驱体质量：{ans_s} g"); self.root.clipboard_clear(); self.root.clipboard_append(ans_s)
+            
+            rec = {"timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"), 'loading': l, 'support': s,
+                   'mx': mx, 'mz': mz, 'mx_name': mx_n, 'mz_name': mz_n, 'precursor_mass': round(ans, 3)}
+            rec['id'] = self.history.append(rec); self.add_history_row(rec)
+        except: messagebox.showerror("错误", "请检查输入数据是否完整且有效")
+
+    def resolve_mass(self, key):
+        """Mx/Mz 输入框既可填数值，也可直接填化学式（按原子质量表计算）"""
+        raw = self.entries[key].get_val().strip()
+        try: val = float(raw)
+        except ValueError: val = self.db.engine.molar_mass(raw); return val, smart_format_formula(raw)
+        return val, (self.selected_names[key] if raw == f"{val:.3f}" else "手动")
+
+    def add_history_row(self, rec):
+        self.tree.insert("", 0, iid=str(rec['id']), values=self.history_values(rec))
+
+    @staticmethod
+    def history_values(r):
+        f3 = lambda v: "-" if v is None else f"{v:.3f}"
+        named = lambda n, v: n if v is None else f"{n}({f3(v)})"  # 多组分配方没有单一的 Mx/Mz
+        return (r['timestamp'], f"{r['loading']}%", f3(r['support']), named(r['mx_name'], r['mx']),
+                named(r['mz_name'], r['mz']), f3(r['precursor_mass']))
+
+    @timed("history.update")
+    def update_history(self):
+        """重新载入第一页；更早的记录在滚动到底部时按页追加"""
+        self.tree.delete(*self.tree.get_children()); self.oldest_id = None; self.history_exhausted = False
+        self.load_history_page()
+
+    @timed("history.page")
+    def load_history_page(self, page_size=200):
+        self.page_pending = False
+        if self.history_exhausted: return
+        rows = self.history.query(limit=page_size, before_id=self.oldest_id)
+        for r in rows: self.tree.insert("", tk.END, iid=str(r['id']), values=self.history_values(r))
+        if rows: self.oldest_id = rows[-1]['id']
+        self.history_exhausted = len(rows) < page_size
+
+    def on_history_scroll(self, last):
+        if float(last) > 0.95 and not self.history_exhausted and not self.page_pending:
+            self.page_pending = True; self.root.after_idle(self.load_history_page)
+
+    def delete_history_item(self):
+        sel = self.tree.selection()
+        if not sel:
+            messagebox.showwarning("提示", "请先在下方列表中选择一条记录")
+            return
+        if messagebox.askyesno("确认删除", "确定要永久删除这条记录吗？"):
+            self.history.delete(int(sel[0])); self.tree.delete(sel[0])
+
+    def export_to_xls(self):
+        if not self.history.count():
+            messagebox.showwarning("导出失败", "历史记录为空")
+            return
+        ExportDialog(self)
+
+    def report_write_errors(self):
+        while not self.write_errors.empty(): messagebox.showerror("保存失败", f"数据库写入失败: {self.write_errors.get()}")
+
+    def poll_write_errors(self):
+        self.report_write_errors(); self.root.after(200, self.poll_write_errors)
+
+    def on_close(self):
+        # 先等已提交的写入落盘，再停止线程；网络盘无响应导致超时后不再重复等待
+        finished = self.db.writer.flush(timeout=5) and self.db.writer.stop(timeout=1)
+        self.report_write_errors()
+        if not finished: messagebox.showwarning("保存未完成", "数据库写入超时（网络盘或磁盘无响应），最近的修改可能未保存")
+        self.history.close(); self.root.destroy()
+
+    def reset(self):
+        for e in self.entries.values(): e.delete(0, tk.END); e._add_placeholder(None)
+        self.selected_names = {"mx": "-", "mz": "-"}; self.res_str.set("所需前驱体质量：-- g")
+
+class RecipeDialog(tk.Toplevel):
+    """多组分（双金属/助剂）配方：各组分负载量均以催化剂总质量为基准，整体求解后存为一条历史记录"""
+    def __init__(self, app):
+        super().__init__(app.root); self.title("多组分配方计算"); self.app = app; self.rows = []
+        top = ttk.Frame(self, padding=15); top.pack(fill=tk.X)
+        ttk.Label(top, text="载体质量 (g)").pack(side=tk.LEFT); self.support = ttk.Entry(top, width=12); self.support.pack(side=tk.LEFT, padx=5)
+        ttk.Button(top, text=" ➕ 添加组分 ", command=self.add_row).pack(side=tk.LEFT, padx=10)
+        self.grid_box = ttk.Frame(self, padding=(15, 0)); self.grid_box.pack(fill=tk.BOTH, expand=True)
+        for c, txt in enumerate(["负载量 (wt.%)", "活性组分 Mx（数值或化学式）", "前驱体 Mz（数值或化学式）", "前驱体质量 (g)"]):
+            ttk.Label(self.grid_box, text=txt).grid(row=0, column=c, padx=5, sticky=tk.W)
+        for _ in range(2): self.add_row()
+        bot = ttk.Frame(self, padding=15); bot.pack(fill=tk.X)
+        self.total = tk.StringVar(value="前驱体总质量：-- g")
+        tk.Label(bot, textvariable=self.total, font=('微软雅黑', 14, 'bold'), fg="#2980B9").pack(side=tk.LEFT)
+        ttk.Button(bot, text=" 🧮 计算并保存 ", command=self.calc).pack(side=tk.RIGHT)
+
+    def add_row(self):
+        r = len(self.rows) + 1
+        cells = [ttk.Entry(self.grid_box, width=w) for w in (10, 24, 24)]
+        for c, e in enumerate(cells): e.grid(row=r, column=c, padx=5, pady=2)
+        out = tk.StringVar(value="--"); ttk.Label(self.grid_box, textvariable=out, width=12).grid(row=r, column=3, padx=5)
+        self.rows.append((cells, out))
+
+    def resolve(self, raw):
+        try: return float(raw), "手动"
+        except ValueError: return self.app.db.engine.molar_mass(raw), smart_format_formula(raw)
+
+    def calc(self):
+        try:
+            s = float(self.support.get()); comps = []
+            for cells, _ in self.rows:
+                l_raw, x_raw, z_raw = (e.get().strip() for e in cells)
+                if not (l_raw or x_raw or z_raw): continue
+                (mx, mx_n), (mz, mz_n) = self.resolve(x_raw), self.resolve(z_raw)
+                comps.append({'loading': float(l_raw), 'mx': mx, 'mz': mz, 'mx_name': mx_n, 'mz_name': mz_n})
+            masses = recipe_precursor_masses(s, [(c['loading'], c['mx'], c['mz']) for c in comps])
+        except ValueError as e: messagebox.showerror("错误", f"请检查输入数据是否完整且有效\n{e}", parent=self); return
+        it = iter(masses)
+        for cells, out in self.rows:
+            out.set(f"{next(it):.3f}" if any(e.get().strip() for e in cells) else "--")
+        for c, m in zip(comps, masses): c['precursor_mass'] = round(m, 3)
+        total = sum(c['precursor_mass'] for c in comps); self.total.set(f"前驱体总质量：{total:.3f} g")
+        summary = "\n".join(f"{c['mz_name']}\t{c['precursor_mass']:.3f}" for c in comps)
+        self.clipboard_clear(); self.clipboard_append(summary)
+        hid = self.app.history.append_recipe(s, comps)
+        self.app.add_history_row(self.app.history.get(hid))
+
+class SuggestionPopup:
+    """输入框下方的化合物联想列表：按键即查全库索引，↑↓ 选择，回车或双击填入"""
+    def __init__(self, entry, db, on_pick, limit=10):
+        self.entry = entry; self.db = db; self.on_pick = on_pick; self.limit = limit; self.results = []
+        self.win = tk.Toplevel(entry); self.win.overrideredirect(True); self.win.withdraw()
+        self.box = tk.Listbox(self.win, height=limit, width=36, font=('微软雅黑', 10), activestyle='dotbox'); self.box.pack()
+        self.box.bind("<ButtonRelease-1>", lambda e: self.pick())
+        entry.bind("<KeyRelease>", self.on_key, add="+")
+        entry.bind("<Down>", lambda e: self.move(1)); entry.bind("<Up>", lambda e: self.move(-1))
+        entry.bind("<Return>", lambda e: self.pick()); entry.bind("<Escape>", lambda e: self.hide())
+        entry.bind("<FocusOut>", lambda e: entry.after(150, self.hide), add="+")
+
+    def on_key(self, e):
+        if e.keysym in ("Up", "Down", "Return", "Escape"): return
+        text = self.entry.get().strip()
+        try: float(text); text = ""
+        except ValueError: pass
+        if not text or self.entry.is_placeholder or not self.db.index_ready: self.hide(); return
+        self.results = self.db.search_compounds(text, self.limit)
+        if not self.results: self.hide(); return
+        self.box.delete(0, tk.END)
+        for sym, f, m in self.results: self.box.insert(tk.END, f"{f}    {m:.3f}    [{sym}]")
+        self.box.config(height=len(self.results)); self.box.selection_set(0)
+        self.win.geometry(f"+{self.entry.winfo_rootx()}+{self.entry.winfo_rooty() + self.entry.winfo_height()}")
+        self.win.deiconify(); self.win.lift()
+
+    def move(self, step):
+        if not self.win.winfo_viewable(): return
+        cur = self.box.curselection(); i = min(max((cur[0] if cur else -1) + step, 0), len(self.results) - 1)
+        self.box.selection_clear(0, tk.END); self.box.selection_set(i); self.box.see(i)
+        return "break"
+
+    def pick(self):
+        cur = self.box.curselection()
+        if not self.win.winfo_viewable() or not cur: return
+        _, f, m = self.results[cur[0]]; self.hide(); self.on_pick(f, m)
+        return "break"
+
+    def hide(self): self.win.withdraw()
+
+class DiagnosticsPanel(ttk.LabelFrame):
+    """仅在开启诊断时显示：各热点操作的调用次数与近期延迟百分位，每秒刷新"""
+    LABELS = {'db.load': "数据库加载", 'db.save': "数据库保存", 'db.write': "数据库落盘", 'pt.setup_ui': "周期表构建", 'pt.on_click': "元素点击刷新",
+              'history.append': "保存历史", 'history.append_many': "批量保存历史", 'history.query': "历史查询",
+              'history.update': "历史列表重建", 'history.page': "历史翻页",
+              'gui.startup': "启动", 'gui.pt_build': "周期表首开", 'gui.pt_show': "周期表打开"}
+
+    def __init__(self, parent, interval_ms=1000):
+        super().__init__(parent, text=" 运行诊断 ", padding=5); self.interval_ms = interval_ms
+        cols = [("op", "操作", 160), ("n", "次数", 70), ("p50", "p50 (ms)", 90), ("p95", "p95 (ms)", 90), ("p99", "p99 (ms)", 90), ("max", "最大 (ms)", 90)]
+        self.tree = ttk.Treeview(self, columns=[c for c, _, _ in cols], show='headings', height=5)
+        for cid, txt, wid in cols: self.tree.heading(cid, text=txt); self.tree.column(cid, width=wid, anchor=tk.W if cid == "op" else tk.E)
+        self.tree.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        box = ttk.Frame(self); box.pack(side=tk.LEFT, padx=10)
+        ttk.Button(box, text="导出 JSONL", command=self.export_trace).pack(fill=tk.X, pady=2)
+        ttk.Button(box, text="导出 cProfile", command=self.export_profile,
+                   state=tk.NORMAL if instrumentation.profiling else tk.DISABLED).pack(fill=tk.X, pady=2)
+        self.refresh()
+
+    def refresh(self):
+        f3 = lambda v: "-" if v is None else f"{v:.3f}"
+        self.tree.delete(*self.tree.get_children())
+        for name, st in instrumentation.stats().items():
+            self.tree.insert("", tk.END, values=(self.LABELS.get(name, name), st['count'], f3(st['p50_ms']), f3(st['p95_ms']), f3(st['p99_ms']), f3(st['max_ms'])))
+        self.after(self.interval_ms, self.refresh)
+
+    def export_trace(self):
+        path = filedialog.asksaveasfilename(parent=self, defaultextension=".jsonl", filetypes=[("JSON lines", "*.jsonl")], initialfile="calc_trace.jsonl")
+        if not path: return
+        try: instrumentation.export_jsonl(path)
+        except OSError as e: messagebox.showerror("导出失败", str(e), parent=self)
+
+    def export_profile(self):
+        path = filedialog.asksaveasfilename(parent=self, defaultextension=".prof", filetypes=[("cProfile", "*.prof")], initialfile="calc_profile.prof")
+        if not path: return
+        try: instrumentation.dump_profile(path)
+        except OSError as e: messagebox.showerror("导出失败", str(e), parent=self)
+
+class PlaceholderEntry(tk.Entry):
+    def __init__(self, master=None, placeholder="", **kwargs):
+        super().__init__(master, **kwargs); self.placeholder = placeholder; self.is_placeholder = True; self.config(fg='grey')
+        self.insert(0, self.placeholder); self.bind("<FocusIn>", self._clear); self.bind("<FocusOut>", self._add)
+    def _clear(self, e):
+        if self.is_placeholder: self.delete(0, tk.END); self.config(fg='black'); self.is_placeholder = False
+    def _add(self, e):
+        if not self.get(): self._add_placeholder(None)
+    def _add_placeholder(self, e):
+        self.delete(0, tk.END); self.insert(0, self.placeholder); self.config(fg='grey'); self.is_placeholder = True
+    def get_val(self): return "0" if self.is_placeholder else self.get()
+
+def run_gui(t0=None):
+    root = tk.Tk(); style = ttk.Style(); style.theme_use('clam'); app = CatalystCalculator(root, t0); root.mainloop()
@@ -0,0 +1,229 @@
+"""本地无界面服务：HTTP/JSON 接口提供前驱体质量计算、化合物查询与历史记录读写。
+
+    python calc.py serve --port 8765 --workers 8
+
+接口（请求与响应均为 JSON，出错时返回 4xx 和 {"error": ...}）：
+    GET  /health
+    POST /calc          {"loading", "support", "mx", "mz"}，mx/mz 可为数值或化学式
+    POST /batch         {"rows": [{"loading", "support", "mx", "mz"}, ...]}
+    POST /recipe        {"support", "components": [{"loading", "mx", "mz"}, ...], "save": false}
+    GET  /molar_mass?formula=
+    GET  /compounds?q=&limit=  或  /compounds?element=
+    POST /compounds     {"element", "formula", "mass"}，mass 省略时按化学式计算；已存在时返回 409 及库内记录
+    GET  /history?start=&end=&element=&precursor=&before_id=&limit=
+    POST /history       {"loading", "support", "mx", "mz", "mx_name", "mz_name"}，结果由服务端计算
+
+测试中可用 port=0 让系统分配端口：server = make_server(port=0); serve_in_thread(server)，
+地址见 server.server_address，结束时调用 server.shutdown()。
+"""
+import json
+import math
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+from calc_core import (ElementInfo, HistoryStore, PersistWorker, smart_format_formula, precursor_mass,
+                       batch_precursor_mass, recipe_precursor_masses, describe_flags)
+
+class ApiError(Exception):
+    """msg 为字符串时响应 {"error": msg}，为 dict 时原样作为响应体"""
+    def __init__(self, msg, status=400): super().__init__(msg); self.status = status
+
+class PooledHTTPServer(HTTPServer):
+    """请求交给固定大小的线程池处理，而不是每个连接新建线程"""
+    request_queue_size = 128  # 默认监听队列只有 5，并发客户端较多时会被重置连接
+
+    def __init__(self, addr, handler, db, history, workers=8):
+        super().__init__(addr, handler)
+        self.db = db; self.history = history; self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="calc-http")
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._handle, request, client_address)
+
+    def _handle(self, request, client_address):
+        try: self.finish_request(request, client_address)
+        except Exception: self.handle_error(request, client_address)
+        finally: self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close(); self.pool.shutdown(wait=True)
+        if self.db.writer: self.db.writer.stop()
+        self.history.close()
+
+def _int(q, key, default=None, minimum=0):
+    """查询参数中的非负整数"""
+    if q.get(key) in (None, ""): return default
+    try: v = int(q[key])
+    except ValueError: raise ApiError(f"参数 {key} 必须为整数")
+    if v < minimum: raise ApiError(f"参数 {key} 不能小于 {minimum}")
+    return v
+
+def _num(body, key):
+    try: v = float(body[key])
+    except KeyError: raise ApiError(f"缺少字段：{key}")
+    except (TypeError, ValueError): raise ApiError(f"字段 {key} 必须为数字")
+    if not math.isfinite(v): raise ApiError(f"字段 {key} 必须为有限数值")
+    return v
+
+def _result(m):
+    """质量保留 3 位小数；Mx 极小等输入会使结果溢出为 inf，JSON 无法表示，按请求错误处理"""
+    if not math.isfinite(m): raise ApiError("计算结果超出数值范围，请检查 Mx/Mz")
+    return round(m, 3)
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "CatalystCalc"
+    timeout = 2  # 慢速或不发送请求的连接最多占用工作线程 2 秒
+
+    def log_message(self, fmt, *args): pass
+
+    # ---------- 基础 ----------
+
+    def _send(self, status, obj):
+        payload = json.dumps(obj, ensure_ascii=False, allow_nan=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8"); self.send_header("Content-Length", str(len(payload)))
+        # 每个响应后关闭连接：线程池大小固定，空闲长连接会占住工作线程，使其他客户端排队
+        self.send_header("Connection", "close"); self.close_connection = True
+        self.end_headers(); self.wfile.write(payload)
+
+    def _body(self):
+        try: n = int(self.headers.get("Content-Length") or 0)
+        except ValueError: n = -1
+        if n < 0: raise ApiError("Content-Length 无效")
+        try: body = json.loads(self.rfile.read(n) or b"{}")
+        except ValueError: raise ApiError("请求体不是有效的 JSON")
+        if not isinstance(body, dict): raise ApiError("请求体必须为 JSON 对象")
+        return body
+
+    def _dispatch(self, method):
+        url = urlsplit(self.path); route = self.ROUTES.get((method, url.path.rstrip('/') or '/'))
+        try:
+            if route is None: raise ApiError("接口不存在", 404)
+            query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            body = self._body() if method == "POST" else None
+            self._send(200, route(self, query, body))
+        except ApiError as e: self._send(e.status, e.args[0] if isinstance(e.args[0], dict) else {"error": str(e)})
+        except Exception as e: self._send(500, {"error": f"{type(e).__name__}: {e}"})
+
+    def do_GET(self): self._dispatch("GET")
+    def do_POST(self): self._dispatch("POST")
+
+    def _mass(self, value, key):
+        """数值直接使用，字符串按化学式解析，返回 (质量, 名称)"""
+        try: v = float(value)
+        except (TypeError, ValueError): v = None
+        if v is not None:
+            if not math.isfinite(v): raise ApiError(f"{key}: 必须为有限数值")
+            return v, "手动"
+        try: return self.server.db.engine.molar_mass(value), smart_format_formula(str(value))
+        except ValueError as e: raise ApiError(f"{key}: {e}")
+
+    # ---------- 接口 ----------
+
+    def health(self, q, body): return {"status": "ok"}
+
+    def calc(self, q, body):
+        (mx, mx_n), (mz, mz_n) = self._mass(body.get('mx'), 'mx'), self._mass(body.get('mz'), 'mz')
+        l, s = _num(body, 'loading'), _num(body, 'support')
+        try: m = precursor_mass(l, s, mx, mz)
+        except ValueError as e: raise ApiError(str(e))
+        return {"precursor_mass": _result(m), "mx": mx, "mz": mz, "mx_name": mx_n, "mz_name": mz_n}
+
+    def batch(self, q, body):
+        rows = body.get('rows')
+        if not isinstance(rows, list) or not all(isinstance(r, dict) for r in rows): raise ApiError("rows 必须为对象数组")
+        def mass_or_nan(v):
+            try: return self._mass(v, '')[0]
+            except ApiError: return math.nan
+        def num_or_nan(v):
+            try: return float(v)
+            except (TypeError, ValueError): return math.nan
+        masses, flags = batch_precursor_mass([num_or_nan(r.get('loading')) for r in rows], [num_or_nan(r.get('support')) for r in rows],
+                                             [mass_or_nan(r.get('mx')) for r in rows], [mass_or_nan(r.get('mz')) for r in rows])
+        results = []
+        for m, c in zip(masses, flags):
+            try: results.append({"precursor_mass": None if int(c) else _result(float(m)), "error": describe_flags(int(c)) or None})
+            except ApiError as e: results.append({"precursor_mass": None, "error": str(e)})
+        return {"results": results}
+
+    def recipe(self, q, body):
+        s = _num(body, 'support'); comps = []
+        comps_in = body.get('components') or []
+        if not isinstance(comps_in, list) or not all(isinstance(c, dict) for c in comps_in): raise ApiError("components 必须为对象数组")
+        for i, c in enumerate(comps_in):
+            (mx, mx_n), (mz, mz_n) = self._mass(c.get('mx'), f'components[{i}].mx'), self._mass(c.get('mz'), f'components[{i}].mz')
+            comps.append({'loading': _num(c, 'loading'), 'mx': mx, 'mz': mz,
+                          'mx_name': c.get('mx_name', mx_n), 'mz_name': c.get('mz_name', mz_n)})
+        try: masses = recipe_precursor_masses(s, [(c['loading'], c['mx'], c['mz']) for c in comps])
+        except ValueError as e: raise ApiError(str(e))
+        for c, m in zip(comps, masses): c['precursor_mass'] = _result(m)
+        out = {"components": comps, "total": round(sum(c['precursor_mass'] for c in comps), 3)}
+        if body.get('save'): out['id'] = self.server.history.append_recipe(s, comps)
+        return out
+
+    def molar_mass(self, q, body):
+        try: mass, comp = self.server.db.engine.parse(q.get('formula', ''))
+        except ValueError as e: raise ApiError(str(e))
+        return {"formula": smart_format_formula(q.get('formula', '')), "molar_mass": mass, "composition": comp}
+
+    def compounds(self, q, body):
+        db = self.server.db; limit = _int(q, 'limit', 20)
+        if 'element' in q:
+            if q['element'] not in db.elements: raise ApiError(f"未知元素：{q['element']}", 404)
+            rows = db.compounds_of(q['element'])[:limit]
+        else: rows = db.search_compounds(q.get('q', ''), limit)
+        return {"results": [{"element": e, "formula": f, "mass": m} for e, f, m in rows]}
+
+    def add_compound(self, q, body):
+        db = self.server.db; sym = body.get('element'); formula = smart_format_formula(str(body.get('formula') or '').strip())
+        if sym not in db.elements: raise ApiError(f"未知元素：{sym}")
+        if not formula: raise ApiError("缺少字段：formula")
+        if body.get('mass') is None: mass = self._mass(formula, 'formula')[0]
+        else: mass = round(_num(body, 'mass'), 3)
+        if not db.add_compound(sym, formula, mass):
+            old = db.get_compound(sym, formula)
+            raise ApiError({"error": "化合物已存在", "element": sym, "formula": old.formula, "mass": old.mass}, 409)
+        db.save_custom_data()
+        return {"element": sym, "formula": formula, "mass": mass}
+
+    def history_query(self, q, body):
+        filters = {k: q[k] for k in ('start', 'end', 'element', 'precursor') if q.get(k)}
+        if q.get('before_id'): filters['before_id'] = _int(q, 'before_id')
+        return {"results": self.server.history.query(limit=min(_int(q, 'limit', 200), 5000), **filters)}
+
+    def history_append(self, q, body):
+        res = self.calc(q, body)
+        rec = {'timestamp': body.get('timestamp') or datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+               'loading': _num(body, 'loading'), 'support': _num(body, 'support'), 'mx': res['mx'], 'mz': res['mz'],
+               'mx_name': body.get('mx_name', res['mx_name']), 'mz_name': body.get('mz_name', res['mz_name']),
+               'precursor_mass': res['precursor_mass']}
+        rec['id'] = self.server.history.append(rec)
+        return rec
+
+    ROUTES = {
+        ("GET", "/health"): health, ("POST", "/calc"): calc, ("POST", "/batch"): batch, ("POST", "/recipe"): recipe,
+        ("GET", "/molar_mass"): molar_mass, ("GET", "/compounds"): compounds, ("POST", "/compounds"): add_compound,
+        ("GET", "/history"): history_query, ("POST", "/history"): history_append,
+    }
+
+def make_server(host="127.0.0.1", port=8765, workers=8, db=None, history=None):
+    db = db or ElementInfo()
+    if db.writer is None: db.writer = PersistWorker()
+    history = history or HistoryStore(engine=db.engine)
+    return PooledHTTPServer((host, port), Handler, db, history, workers)
+
+def serve_in_thread(server):
+    """后台线程运行服务（供测试使用），返回线程对象"""
+    t = threading.Thread(target=server.serve_forever, name="calc-http-main", daemon=True); t.start()
+    return t
+
+def serve(host="127.0.0.1", port=8765, workers=8):
+    server = make_server(host, port, workers)
+    threading.Thread(target=lambda: server.db.index, daemon=True).start()  # 预先构建检索索引
+    print(f"服务已启动：http://{server.server_address[0]}:{server.server_address[1]}（Ctrl+C 退出）", flush=True)
+    try: server.serve_forever()
+    except KeyboardInterrupt: pass
+    finally: server.server_close()
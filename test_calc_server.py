@@ -0,0 +1,100 @@
+"""本地服务的端到端测试：在 127.0.0.1 的随机端口启动服务，数据文件放在临时目录。
+
+    python -m pytest -q test_calc_server.py    （或 python -m unittest test_calc_server）
+"""
+import os
+import json
+import shutil
+import socket
+import tempfile
+import unittest
+from urllib.request import urlopen, Request
+from urllib.error import HTTPError
+
+from calc_core import ElementInfo, HistoryStore, PersistWorker
+from calc_server import make_server, serve_in_thread
+
+class ServerTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        path = lambda name: os.path.join(self.tmp, name)
+        self.db = ElementInfo(filename=path("element_db.json"), snapshot=None); self.db.writer = PersistWorker(delay=0)
+        history = HistoryStore(path=path("calc_history.db"), legacy_json=path("calc_history.json"), engine=self.db.engine)
+        self.server = make_server(port=0, workers=4, db=self.db, history=history); serve_in_thread(self.server)
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def tearDown(self):
+        self.server.shutdown(); self.server.server_close(); shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def call(self, path, body=None):
+        data = None if body is None else json.dumps(body).encode('utf-8')
+        req = Request(self.base + path, data, method="GET" if data is None else "POST")
+        try:
+            with urlopen(req, timeout=5) as r: return r.status, json.loads(r.read())
+        except HTTPError as e: return e.code, json.loads(e.read())
+
+    def test_calc(self):
+        status, res = self.call("/calc", {"loading": 5, "support": 10, "mx": "Ni", "mz": "Ni(NO3)2.6H2O"})
+        self.assertEqual(status, 200)
+        self.assertAlmostEqual(res["precursor_mass"], 2.608, places=3)
+        self.assertEqual(res["mz_name"], "Ni(NO₃)₂·6H₂O")
+        status, res = self.call("/calc", {"loading": 100, "support": 10, "mx": 1, "mz": 1})
+        self.assertEqual(status, 400)
+
+    def raw(self, head, body=b""):
+        """绕过 urllib 直接发送请求头，返回状态码"""
+        with socket.create_connection(self.server.server_address, timeout=5) as sock:
+            sock.sendall(head.encode('ascii') + b"\r\n\r\n" + body)
+            return int(sock.makefile('rb').readline().split()[1])
+
+    def test_bad_content_length(self):
+        for value in ("abc", "-1"):
+            self.assertEqual(self.raw(f"POST /calc HTTP/1.1\r\nHost: x\r\nContent-Length: {value}", b"{}"), 400)
+
+    def test_non_finite(self):
+        status, res = self.call("/calc", {"loading": 5, "support": 10, "mx": 1e-300, "mz": 1e10})
+        self.assertEqual(status, 400); self.assertIn("error", res)
+        self.assertEqual(self.call("/calc", {"loading": "nan", "support": 10, "mx": 1, "mz": 1})[0], 400)
+        self.assertEqual(self.call("/calc", {"loading": 5, "support": 10, "mx": "inf", "mz": 1})[0], 400)
+        self.assertEqual(self.call("/recipe", {"support": 10, "components": [{"loading": 5, "mx": 1e-300, "mz": 1e10}]})[0], 400)
+        status, res = self.call("/batch", {"rows": [{"loading": 5, "support": 10, "mx": 1e-300, "mz": 1e10}]})
+        self.assertEqual(status, 200)
+        self.assertIsNone(res["results"][0]["precursor_mass"]); self.assertTrue(res["results"][0]["error"])
+
+    def test_batch(self):
+        status, res = self.call("/batch", {"rows": [{"loading": 5, "support": 10, "mx": 58.693, "mz": 290.795},
+                                                    {"loading": 120, "support": 10, "mx": 1, "mz": 1},
+                                                    {"loading": 5, "support": 10, "mx": "Xx", "mz": 1}]})
+        self.assertEqual(status, 200)
+        ok, high, bad = res["results"]
+        self.assertAlmostEqual(ok["precursor_mass"], 2.608, places=3); self.assertIsNone(ok["error"])
+        self.assertIsNone(high["precursor_mass"]); self.assertTrue(high["error"])
+        self.assertIsNone(bad["precursor_mass"]); self.assertTrue(bad["error"])
+        self.assertEqual(self.call("/batch", {"rows": [1, 2]})[0], 400)
+
+    def test_compounds(self):
+        status, res = self.call("/compounds", {"element": "Ni", "formula": "NiS", "mass": 90.76})
+        self.assertEqual((status, res["formula"]), (200, "NiS"))
+        status, res = self.call("/compounds?element=Ni")
+        self.assertIn("NiS", [r["formula"] for r in res["results"]])
+        # 重复条目（包括写法不同但规范化后相同的化学式）返回 409 和库内记录，不覆盖分子量
+        status, res = self.call("/compounds", {"element": "Ni", "formula": "NiO", "mass": 1.23})
+        self.assertEqual((status, res["mass"]), (409, 74.692))
+        status, res = self.call("/compounds", {"element": "Ni", "formula": "Ni S", "mass": 1.0})
+        self.assertEqual((status, res["formula"]), (409, "NiS"))
+        self.assertEqual(self.db.get_compound("Ni", "NiO").mass, 74.692)
+        self.assertTrue(self.db.writer.flush(timeout=5))  # 后台写入完成后重新加载，新增条目已落盘
+        self.assertEqual(ElementInfo(filename=self.db.filename, snapshot=None).get_compound("Ni", "NiS").mass, 90.76)
+        self.assertEqual(self.call("/compounds?q=Ni&limit=-1")[0], 400)
+
+    def test_history_round_trip(self):
+        status, rec = self.call("/history", {"loading": 5, "support": 10, "mx": "Ni", "mz": "NiO"})
+        self.assertEqual(status, 200)
+        status, res = self.call("/history?element=Ni&limit=10")
+        self.assertEqual([r["id"] for r in res["results"]], [rec["id"]])
+        self.assertAlmostEqual(res["results"][0]["precursor_mass"], rec["precursor_mass"])
+        self.assertEqual(self.call(f"/history?before_id={rec['id']}")[1]["results"], [])
+        self.assertEqual(self.call("/history?limit=abc")[0], 400)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+"""用户化合物库与历史记录迁移的测试：数据文件放在临时目录。
+
+    python -m pytest -q test_element_db.py    （或 python -m unittest test_element_db）
+"""
+import os
+import json
+import shutil
+import tempfile
+import unittest
+
+from calc_core import ElementInfo, HistoryStore
+
+class ElementDbTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(); self.filename = os.path.join(self.tmp, "element_db.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def open(self, snapshot=None): return ElementInfo(filename=self.filename, snapshot=snapshot)
+
+    def saved(self):
+        with open(self.filename, encoding='utf-8') as f: return json.load(f)
+
+    def rows(self, db, sym): return [(f, m) for f, m in db.elements[sym]['compounds']]
+
+    def test_diff_round_trip(self):
+        db = self.open()
+        self.assertTrue(db.add_compound("Ni", "NiS", 90.758))
+        self.assertTrue(db.remove_compound("Ni", "Ni(OH)2"))
+        db.save_custom_data()
+        # 只写出相对内置库的增删，未改动的元素不出现在文件中
+        self.assertEqual(self.saved(), {'version': 2, 'elements': {'Ni': {'added': [["NiS", 90.758]], 'removed': ["Ni(OH)₂"]}}})
+        for snapshot in (None, True, True):  # 不用快照、首次生成快照、从快照加载，结果一致
+            again = self.open(snapshot)
+            self.assertEqual(self.rows(again, "Ni"), self.rows(db, "Ni"))
+            self.assertEqual(again.builtin["Ni"].to_rows(), db.builtin["Ni"].to_rows())
+            self.assertIsNone(again.get_compound("Ni", "Ni(OH)2"))
+
+    def test_mass_change_is_remove_and_add(self):
+        db = self.open()
+        db.remove_compound("Ni", "NiO"); db.add_compound("Ni", "NiO", 74.7)
+        db.save_custom_data()
+        self.assertEqual(self.saved()['elements'], {'Ni': {'added': [["NiO", 74.7]], 'removed': ["NiO"]}})
+        self.assertEqual(self.open().get_compound("Ni", "NiO").mass, 74.7)
+        # 改回内置值后差异为空
+        db.remove_compound("Ni", "NiO"); db.add_compound("Ni", "NiO", 74.692); db.save_custom_data()
+        self.assertEqual(self.saved(), {'version': 2, 'elements': {}})
+
+    def test_legacy_full_dump(self):
+        builtin = self.open().elements["Ni"]
+        legacy = {"Ni": {"name": builtin['name'], "mass": builtin['mass'], "compounds": [["NiO", 74.692], ["NiS", 90.758]]}}
+        with open(self.filename, 'w', encoding='utf-8') as f: json.dump(legacy, f)
+        db = self.open()
+        self.assertIsNone(db.load_error)
+        self.assertEqual(self.rows(db, "Ni"), [("NiO", 74.692), ("NiS", 90.758)])
+        self.assertEqual(self.rows(db, "Co"), self.rows(self.open(), "Co"))  # 旧文件中没有的元素保持内置数据
+        # 再次保存即转为差异格式，旧文件省略的内置条目记为删除
+        db.save_custom_data()
+        saved = self.saved()
+        self.assertEqual(saved['version'], 2)
+        self.assertEqual(saved['elements']['Ni']['added'], [["NiS", 90.758]])
+        self.assertEqual(set(saved['elements']['Ni']['removed']), {"Ni(OH)₂", "Ni(NO₃)₂·6H₂O"})  # 内置条目以显示写法保存
+        self.assertEqual(self.rows(self.open(), "Ni"), self.rows(db, "Ni"))
+
+    def test_corrupt_file_is_backed_up(self):
+        with open(self.filename, 'w', encoding='utf-8') as f: f.write("{not json")
+        db = self.open()
+        error, backup = db.load_error
+        self.assertTrue(backup and os.path.exists(backup)); self.assertFalse(os.path.exists(self.filename))
+        self.assertIsNotNone(db.get_compound("Ni", "NiO"))
+
+class MigrateJsonTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_legacy_strings(self):
+        legacy = os.path.join(self.tmp, "calc_history.json")
+        with open(legacy, 'w', encoding='utf-8') as f:
+            json.dump([{"timestamp": "2024-05-02 10:00:00", "inputs": {"loading": "7.0%", "support": "10", "mx": "58.693", "mz": "290.795",
+                                                                       "mx_name": "Ni", "mz_name": "Ni(NO₃)₂·6H₂O"},
+                        "results": {"precursor_mass": "3.788"}},
+                       {"timestamp": "2024-05-01 09:00:00", "inputs": {"loading": "abc", "support": "5"}, "results": {}}], f)
+        engine = ElementInfo(filename=os.path.join(self.tmp, "element_db.json"), snapshot=None).engine
+        store = HistoryStore(path=os.path.join(self.tmp, "calc_history.db"), legacy_json=legacy, engine=engine)
+        try:
+            new, old = store.query()  # 按时间顺序写入，新记录 ID 更大
+            self.assertEqual((new['loading'], new['support'], new['mx'], new['precursor_mass']), (7.0, 10.0, 58.693, 3.788))
+            self.assertEqual((old['loading'], old['support'], old['precursor_mass']), (None, 5.0, None))
+            self.assertEqual([r['id'] for r in store.query(element="Ni")], [new['id']])
+            self.assertEqual(store.migrate_json(legacy), 0)  # 只迁移一次
+        finally: store.close()
+
+if __name__ == "__main__":
+    unittest.main()
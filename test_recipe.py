@@ -0,0 +1,128 @@
+"""多组分配方求解与配方历史记录的测试。
+
+    python -m pytest -q test_recipe.py    （或 python -m unittest test_recipe）
+"""
+import io
+import math
+import os
+import shutil
+import tempfile
+import unittest
+
+import calc_core
+from calc_core import (ElementInfo, HistoryStore, precursor_mass, recipe_precursor_masses, batch_precursor_mass, batch_recipe_masses,
+                       describe_flags, ERR_LOADING_HIGH, ERR_LOADING_NEG, ERR_LOADING_NAN, ERR_SUPPORT, ERR_MZ)
+from calc import _read_recipes
+
+NI, NI_NITRATE = 58.693, 290.795
+LA, LA_NITRATE = 138.905, 433.01
+
+class RecipeSolverTest(unittest.TestCase):
+    def test_single_component_matches_precursor_mass(self):
+        for loading in (0.5, 5, 37.5, 99):
+            [m] = recipe_precursor_masses(10, [(loading, NI, NI_NITRATE)])
+            self.assertAlmostEqual(m, precursor_mass(loading, 10, NI, NI_NITRATE), places=9)
+
+    def test_two_components(self):
+        ni, la = recipe_precursor_masses(10, [(5, NI, NI_NITRATE), (3, LA, LA_NITRATE)])
+        self.assertAlmostEqual(ni, 2.693, places=3)
+        self.assertAlmostEqual(la, 1.017, places=3)
+
+    def test_invalid_recipe_raises(self):
+        with self.assertRaises(ValueError): recipe_precursor_masses(10, [(60, NI, NI_NITRATE), (40, LA, LA_NITRATE)])
+        with self.assertRaises(ValueError): recipe_precursor_masses(10, [(5, NI, 0)])
+        with self.assertRaises(ValueError): recipe_precursor_masses(10, [])
+
+class BatchRecipeTest(unittest.TestCase):
+    # 第 2 行为单组分，以负载量 0 补齐；第 3 行合计 100%；第 4 行载体质量无效；第 5 行第二组分 Mz 无效
+    support = [10, 10, 10, 0, 10]
+    loading = [[5, 3], [5, 0], [60, 40], [5, 3], [5, 3]]
+    mx = [[NI, LA], [NI, 0.0], [NI, LA], [NI, LA], [NI, LA]]
+    mz = [[NI_NITRATE, LA_NITRATE], [NI_NITRATE, 0.0], [NI_NITRATE, LA_NITRATE], [NI_NITRATE, LA_NITRATE], [NI_NITRATE, -1]]
+
+    def solve(self):
+        masses, flags = batch_recipe_masses(self.support, self.loading, self.mx, self.mz)
+        return [[float(m) for m in row] for row in masses], [int(c) for c in flags]
+
+    def check(self, masses, flags):
+        self.assertEqual(flags, [0, 0, ERR_LOADING_HIGH, ERR_SUPPORT, ERR_MZ])
+        self.assertAlmostEqual(masses[0][0], 2.693, places=3); self.assertAlmostEqual(masses[0][1], 1.017, places=3)
+        self.assertAlmostEqual(masses[1][0], precursor_mass(5, 10, NI, NI_NITRATE), places=9)
+        self.assertEqual(masses[1][1], 0.0)  # 补齐的组分不参与计算，也不触发 Mx/Mz 无效
+        for row in masses[2:]: self.assertTrue(all(math.isnan(m) for m in row))  # 无效配方整行为 nan
+
+    def test_numpy(self):
+        if calc_core._numpy() is None: self.skipTest("未安装 numpy")
+        self.check(*self.solve())
+
+    def test_fallback_matches_numpy(self):
+        np = calc_core._numpy(); calc_core._np = None
+        try: masses, flags = self.solve()
+        finally: calc_core._np = np if np is not None else False
+        self.check(masses, flags)
+        if np is not None:
+            expected, expected_flags = self.solve()
+            self.assertEqual(flags, expected_flags)
+            for row, exp in zip(masses, expected):
+                for m, e in zip(row, exp): self.assertTrue(math.isnan(m) and math.isnan(e) or abs(m - e) < 1e-9)
+
+    def test_negative_component(self):
+        _, flags = batch_recipe_masses([10], [[5, -3]], [[NI, LA]], [[NI_NITRATE, LA_NITRATE]])
+        self.assertEqual(int(flags[0]), ERR_LOADING_NEG)
+
+    def test_nan_loading(self):
+        # 缺失的负载量只报“负载量无效”，不再同时报 ≥100% 和 <0；numpy 与纯 Python 路径一致
+        np = calc_core._numpy()
+        for numpy in ((np, None) if np is not None else (None,)):
+            calc_core._np = numpy
+            try:
+                _, flags = batch_precursor_mass([math.nan, 120, -1], [10] * 3, [NI] * 3, [NI_NITRATE] * 3)
+                self.assertEqual([int(c) for c in flags], [ERR_LOADING_NAN, ERR_LOADING_HIGH, ERR_LOADING_NEG])
+                _, flags = batch_recipe_masses([10], [[5, math.nan]], [[NI, LA]], [[NI_NITRATE, LA_NITRATE]])
+                self.assertEqual(int(flags[0]), ERR_LOADING_NAN)
+            finally: calc_core._np = np if np is not None else False
+        self.assertEqual(describe_flags(ERR_LOADING_NAN), "负载量无效")
+        with self.assertRaisesRegex(ValueError, "负载量无效"): precursor_mass(math.nan, 10, NI, NI_NITRATE)
+
+class ReadRecipesTest(unittest.TestCase):
+    def test_grouping(self):
+        text = "recipe,support,loading,mx,mz\nA,10,5,Ni,Ni(NO3)2.6H2O\nA,10,3,La,La(NO3)3.6H2O\nB,5,7.0%,Ni,NiO\nC,2,1,Co,CoO\n"
+        chunks = list(_read_recipes(io.StringIO(text), chunk_size=2))
+        self.assertEqual([[rid for rid, _, _ in c] for c in chunks], [["A", "B"], ["C"]])
+        rid, support, comps = chunks[0][0]
+        self.assertEqual((support, comps), ("10", [["5", "Ni", "Ni(NO3)2.6H2O"], ["3", "La", "La(NO3)3.6H2O"]]))
+        self.assertEqual(chunks[0][1][2], [["7.0%", "Ni", "NiO"]])
+
+    def test_columns_by_header(self):
+        text = "mz,mx,loading,support,recipe\nNiO,Ni,5,10,A\n"
+        [[row]] = list(_read_recipes(io.StringIO(text), chunk_size=10))
+        self.assertEqual(row, ("A", "10", [["5", "Ni", "NiO"]]))
+
+class RecipeHistoryTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        db = ElementInfo(filename=os.path.join(self.tmp, "element_db.json"), snapshot=None)
+        self.store = HistoryStore(path=os.path.join(self.tmp, "calc_history.db"), legacy_json=None, engine=db.engine)
+
+    def tearDown(self):
+        self.store.close(); shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_append_recipe(self):
+        ni, la = recipe_precursor_masses(10, [(5, NI, NI_NITRATE), (3, LA, LA_NITRATE)])
+        hid = self.store.append_recipe(10, [
+            {'loading': 5, 'mx': NI, 'mz': NI_NITRATE, 'mx_name': "Ni", 'mz_name': "Ni(NO₃)₂·6H₂O", 'precursor_mass': ni},
+            {'loading': 3, 'mx': LA, 'mz': LA_NITRATE, 'mx_name': "La", 'mz_name': "La(NO₃)₃·6H₂O", 'precursor_mass': la}])
+        self.store.append({'loading': 5, 'support': 10, 'mx': NI, 'mz': 74.692, 'mx_name': "Ni", 'mz_name': "NiO", 'precursor_mass': 0.673})
+        rec = self.store.get(hid)
+        self.assertEqual((rec['loading'], rec['mz_name']), (8, "Ni(NO₃)₂·6H₂O+La(NO₃)₃·6H₂O"))
+        self.assertAlmostEqual(rec['precursor_mass'], round(ni + la, 3))
+        self.assertEqual([c['mx_name'] for c in rec['components']], ["Ni", "La"])
+        # 元素与前驱体按组分写入附表，可按其中任一组分查到整条配方
+        self.assertEqual([r['id'] for r in self.store.query(element="La")], [hid])
+        self.assertEqual(len(self.store.query(element="Ni")), 2)
+        self.assertEqual([r['id'] for r in self.store.query(precursor="La(NO3)3·6H2O")], [hid])
+        self.assertTrue(self.store.delete(hid))
+        self.assertEqual(self.store.query(element="La"), [])
+
+if __name__ == "__main__":
+    unittest.main()